@@ -1,62 +1,25 @@
 #!/usr/bin/env python3
 """
 Admin Cleanup Script - Remove test/fake reviews easily
-"""
 
-import sqlite3
-import re
+Interactive front end over cleanup_job; works against DATABASE_URL
+(SQLite locally, Postgres in production). For unattended runs use
+`python cleanup_job.py --help`.
+"""
 
-def connect_db():
-    """Connect to the SQLite database"""
-    try:
-        conn = sqlite3.connect('oldweiler.db')
-        conn.row_factory = sqlite3.Row
-        return conn
-    except sqlite3.Error as e:
-        print(f"Error connecting to database: {e}")
-        return None
+from sqlalchemy import delete, func, select
+from database import SessionLocal, engine
+from models import Review
+from review_stats import rebuild_stats
+from cleanup_job import delete_reviews, find_matches, iter_review_chunks, run as run_cleanup_job
 
-def find_test_reviews(conn):
-    """Find reviews that look like test data"""
-    cursor = conn.cursor()
-    
-    # Common test patterns
-    test_patterns = [
-        # Test names
-        r'test|demo|sample|fake|dummy|example',
-        # Test content
-        r'test review|sample review|fake review|demo review',
-        # Generic content
-        r'great work|amazing|excellent|wonderful|fantastic',
-        # Very short reviews
-        r'^.{1,20}$',
-        # Common test phrases
-        r'this is a test|testing|test message'
-    ]
-    
-    cursor.execute("SELECT * FROM reviews ORDER BY id DESC")
-    all_reviews = cursor.fetchall()
-    
+def find_test_reviews(min_score=1):
+    """Find reviews that look like test data (default: any heuristic match)"""
     test_reviews = []
-    
-    for review in all_reviews:
-        name = review['name'].lower()
-        text = review['text'].lower()
-        
-        # Check if review matches test patterns
-        is_test = False
-        for pattern in test_patterns:
-            if re.search(pattern, name) or re.search(pattern, text):
-                is_test = True
-                break
-        
-        # Also check for very generic content
-        if len(text) < 25 and any(word in text for word in ['good', 'great', 'nice', 'amazing']):
-            is_test = True
-            
-        if is_test:
-            test_reviews.append(review)
-    
+    for rows in iter_review_chunks():
+        test_reviews.extend(find_matches(rows, min_score))
+    # Newest first, as before
+    test_reviews.reverse()
     return test_reviews
 
 def show_test_reviews(test_reviews):
@@ -76,9 +39,9 @@ def show_test_reviews(test_reviews):
         print(f"   Created: {review['created_at'] if review['created_at'] else 'N/A'}")
         print("-" * 80)
 
-def quick_cleanup(conn):
+def quick_cleanup():
     """Quick cleanup - remove obvious test reviews"""
-    test_reviews = find_test_reviews(conn)
+    test_reviews = find_test_reviews()
     
     if not test_reviews:
         print("✅ No test reviews to clean up!")
@@ -95,7 +58,6 @@ def quick_cleanup(conn):
     
     if choice == '1':
         # Remove all test reviews
-        cursor = conn.cursor()
         test_ids = [review['id'] for review in test_reviews]
         
         print(f"\n⚠️  About to delete {len(test_ids)} test reviews:")
@@ -104,23 +66,19 @@ def quick_cleanup(conn):
         
         confirm = input("\nType 'DELETE TESTS' to confirm: ").strip()
         if confirm == 'DELETE TESTS':
-            placeholders = ','.join('?' * len(test_ids))
-            cursor.execute(f"DELETE FROM reviews WHERE id IN ({placeholders})", test_ids)
-            conn.commit()
-            print(f"✅ Deleted {len(test_ids)} test reviews!")
+            deleted = delete_reviews(test_reviews)
+            print(f"✅ Deleted {deleted} test reviews!")
         else:
             print("❌ Cleanup cancelled.")
             
     elif choice == '2':
         # Individual review
-        individual_cleanup(conn, test_reviews)
+        individual_cleanup(test_reviews)
     else:
         print("❌ Cleanup cancelled.")
 
-def individual_cleanup(conn, test_reviews):
+def individual_cleanup(test_reviews):
     """Clean up reviews one by one"""
-    cursor = conn.cursor()
-    
     for i, review in enumerate(test_reviews, 1):
         print(f"\n📝 Review {i}/{len(test_reviews)}:")
         print(f"ID: {review['id']}")
@@ -131,8 +89,7 @@ def individual_cleanup(conn, test_reviews):
         action = input("\nAction: (d)elete, (k)eep, (s)kip all: ").strip().lower()
         
         if action == 'd':
-            cursor.execute("DELETE FROM reviews WHERE id = ?", (review['id'],))
-            conn.commit()
+            delete_reviews([review])
             print(f"✅ Deleted review {review['id']}")
         elif action == 's':
             print("⏭️  Skipping remaining reviews...")
@@ -147,11 +104,6 @@ def main():
     print("🧹 ADMIN CLEANUP - Remove Test Reviews")
     print("=" * 50)
     
-    conn = connect_db()
-    if not conn:
-        print("❌ Failed to connect to database")
-        return
-    
     try:
         while True:
             print("\nOptions:")
@@ -160,47 +112,54 @@ def main():
             print("3. ✋ Individual cleanup (review each)")
             print("4. 📊 View all reviews")
             print("5. 🗑️  Remove ALL reviews (nuclear option)")
+            print("6. 🧪 Dry-run the batch cleanup job")
             print("0. Exit")
             
-            choice = input("\nEnter choice (0-5): ").strip()
+            choice = input("\nEnter choice (0-6): ").strip()
             
             if choice == '0':
                 break
             elif choice == '1':
-                test_reviews = find_test_reviews(conn)
+                test_reviews = find_test_reviews()
                 show_test_reviews(test_reviews)
                 if test_reviews:
                     print("\n🗑️  Would you like to clean up these test reviews?")
                     cleanup_choice = input("Enter 'y' for quick cleanup, 'n' to return to menu: ").strip().lower()
                     if cleanup_choice == 'y':
-                        quick_cleanup(conn)
+                        quick_cleanup()
             elif choice == '2':
-                quick_cleanup(conn)
+                quick_cleanup()
             elif choice == '3':
-                test_reviews = find_test_reviews(conn)
+                test_reviews = find_test_reviews()
                 if test_reviews:
-                    individual_cleanup(conn, test_reviews)
+                    individual_cleanup(test_reviews)
                 else:
                     print("✅ No test reviews found!")
             elif choice == '4':
-                cursor = conn.cursor()
-                cursor.execute("SELECT * FROM reviews ORDER BY id DESC")
-                reviews = cursor.fetchall()
-                print(f"\n📝 Total reviews: {len(reviews)}")
-                for review in reviews:
-                    print(f"ID: {review['id']} | {review['name']} | {review['text'][:50]}...")
+                with engine.connect() as conn:
+                    count = conn.execute(select(func.count()).select_from(Review)).scalar_one()
+                print(f"\n📝 Total reviews: {count}")
+                for rows in iter_review_chunks():
+                    for review in rows:
+                        print(f"ID: {review['id']} | {review['name']} | {review['text'][:50]}...")
             elif choice == '5':
-                cursor = conn.cursor()
-                cursor.execute("SELECT COUNT(*) FROM reviews")
-                count = cursor.fetchone()[0]
+                with engine.connect() as conn:
+                    count = conn.execute(select(func.count()).select_from(Review)).scalar_one()
                 print(f"\n⚠️  NUCLEAR OPTION: Remove ALL {count} reviews!")
                 confirm = input("Type 'NUCLEAR' to confirm: ").strip()
                 if confirm == 'NUCLEAR':
-                    cursor.execute("DELETE FROM reviews")
-                    conn.commit()
+                    db = SessionLocal()
+                    try:
+                        db.execute(delete(Review))
+                        rebuild_stats(db)
+                        db.commit()
+                    finally:
+                        db.close()
                     print(f"💥 All {count} reviews deleted!")
                 else:
                     print("❌ Nuclear option cancelled.")
+            elif choice == '6':
+                run_cleanup_job(dry_run=True)
             else:
                 print("❌ Invalid choice")
                 
@@ -208,8 +167,6 @@ def main():
             
     except KeyboardInterrupt:
         print("\n\n👋 Admin cleanup interrupted!")
-    finally:
-        conn.close()
 
 if __name__ == "__main__":
     main()
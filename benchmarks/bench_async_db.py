@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Sync vs async database path throughput for the reviews router.
+
+Starts uvicorn twice against the same seeded SQLite file, once with
+DB_ASYNC=false and once with DB_ASYNC=true, and drives uncached
+GET /reviews/?limit=20 (plus an optional share of POSTs) at high
+concurrency. Needs httpx on top of requirements.txt.
+
+    python benchmarks/bench_async_db.py --concurrency 200 --duration 15
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def seed(db_path: str, rows: int):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}")
+    subprocess.run([sys.executable, "init_db.py"], cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO reviews (name, text, rating) VALUES (?, ?, ?)",
+        ((f"Customer {i}", f"Benchmark review number {i} about a deck", random.randint(1, 5)) for i in range(rows)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def start_server(db_path: str, port: int, use_async: bool) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{db_path}",
+        DB_ASYNC="true" if use_async else "false",
+        REVIEWS_CACHE_TTL="0",  # measure the database path, not the listing cache
+        OUTBOX_WORKER_ENABLED="false",
+        RESEND_API_KEY=os.getenv("RESEND_API_KEY", "re_benchmark"),
+        ENV="production",
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+
+
+async def wait_ready(base_url: str, timeout: float = 20):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(f"{base_url}/")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+async def drive(base_url: str, concurrency: int, duration: float, write_ratio: float) -> dict:
+    latencies, errors = [], 0
+    stop_at = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def worker():
+            nonlocal errors
+            while time.monotonic() < stop_at:
+                start = time.perf_counter()
+                if random.random() < write_ratio:
+                    response = await client.post("/reviews/", json={"name": "Bench", "text": "Benchmark insert text", "rating": 4})
+                else:
+                    response = await client.get("/reviews/", params={"limit": 20})
+                latencies.append(time.perf_counter() - start)
+                if response.status_code >= 400:
+                    errors += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / duration, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        seed(db_path, args.rows)
+
+        for use_async in (False, True):
+            server = start_server(db_path, args.port, use_async)
+            try:
+                base_url = f"http://127.0.0.1:{args.port}"
+                asyncio.run(wait_ready(base_url))
+                result = asyncio.run(drive(base_url, args.concurrency, args.duration, args.write_ratio))
+            finally:
+                server.terminate()
+                server.wait()
+            print(f"{'async' if use_async else 'sync ':5}  {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Cold start: time from launching `uvicorn main:app` to the first byte of
+GET /livez, and to the first GET /reviews/?limit=20 and POST /contact/
+answered after that.
+
+--compare-rev exports an earlier git revision (e.g. the commit before the
+lifespan/lazy-init change) and measures it the same way, so the drop can
+be read off directly.
+
+    python benchmarks/bench_cold_start.py --runs 10 --compare-rev HEAD~1
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def export_revision(rev: str, dest: str) -> str:
+    archive = os.path.join(dest, "tree.tar")
+    subprocess.run(["git", "archive", "-o", archive, rev], cwd=ROOT, check=True)
+    tree = os.path.join(dest, "tree")
+    with tarfile.open(archive) as tar:
+        tar.extractall(tree)
+    return tree
+
+
+def wait_for_port(port: int, deadline: float):
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.05):
+                return
+        except OSError:
+            time.sleep(0.002)
+    raise RuntimeError("server did not start")
+
+
+def measure(tree: str, db_path: str, port: int) -> dict:
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{db_path}",
+        ENV="production",
+        LOG_FILE="",
+        EMAIL_SENDER="fake",
+        RESEND_API_KEY="re_cold_start",  # older revisions refuse to import without it
+        RATE_LIMIT_REQUESTS="1000000",
+    )
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=tree, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(port, time.monotonic() + 30)
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=30) as client:
+            with client.stream("GET", "/livez") as response:
+                next(response.iter_raw())
+                first_byte = time.perf_counter() - started
+            client.get("/reviews/", params={"limit": 20}).raise_for_status()
+            first_read = time.perf_counter() - started
+            client.post("/contact/", json={
+                "name": "Cold Start", "email": "cold@example.com", "message": "Timing the first contact form post",
+            }).raise_for_status()
+            first_write = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+    return {"livez_ttfb_ms": first_byte * 1000, "first_reviews_ms": first_read * 1000, "first_contact_ms": first_write * 1000}
+
+
+def run(label: str, tree: str, runs: int, port: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "cold.db")
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", RESEND_API_KEY="re_cold_start")
+        subprocess.run([sys.executable, "init_db.py"], cwd=tree, env=env, check=True, stdout=subprocess.DEVNULL)
+        measure(tree, db_path, port)  # prime the OS page cache and __pycache__
+        samples = [measure(tree, db_path, port) for _ in range(runs)]
+
+    print(f"{label}:")
+    for key in samples[0]:
+        values = [sample[key] for sample in samples]
+        print(f"  {key:18} median {statistics.median(values):7.1f} ms   min {min(values):7.1f} ms   max {max(values):7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--compare-rev", help="git revision to measure as well, e.g. HEAD~1")
+    args = parser.parse_args()
+
+    if args.compare_rev:
+        with tempfile.TemporaryDirectory() as tmp:
+            run(args.compare_rev, export_revision(args.compare_rev, tmp), args.runs, args.port)
+    run("working tree", ROOT, args.runs, args.port)
+
+
+if __name__ == "__main__":
+    main()
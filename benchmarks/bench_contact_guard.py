@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+CPU cost of a bot hitting POST /contact/ with the honeypot filled: the full
+middleware stack is driven in-process over raw ASGI (no sockets, no test
+client), once with contact_guard's stages enabled and once with
+CONTACT_GUARD_STAGES empty, where the request is only turned away by
+ContactForm validation. Each mode runs in its own interpreter.
+
+    python benchmarks/bench_contact_guard.py --requests 20000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BOT_BODY = json.dumps({
+    "name": "Cheap Pills", "email": "bot@example.com", "message": "Buy now at our fantastic online store!!!",
+    "company": "Spam Inc",
+}).encode()
+
+
+async def drive(app, requests: int) -> dict:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": "/contact/", "raw_path": b"/contact/", "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench"), (b"content-type", b"application/json"),
+                    (b"content-length", str(len(BOT_BODY)).encode())],
+        "client": ("203.0.113.9", 40000), "server": ("bench", 80),
+    }
+    statuses = {}
+
+    for _ in range(requests):
+        async def receive():
+            return {"type": "http.request", "body": BOT_BODY, "more_body": False}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses[message["status"]] = statuses.get(message["status"], 0) + 1
+
+        await app(dict(scope), receive, send)
+    return statuses
+
+
+def child(requests: int):
+    sys.path.insert(0, ROOT)
+    import logging
+    import main
+    logging.disable(logging.CRITICAL)
+
+    asyncio.run(drive(main.app, 200))  # warm up
+    started = time.process_time()
+    statuses = asyncio.run(drive(main.app, requests))
+    cpu = time.process_time() - started
+    print(json.dumps({"cpu_us": cpu / requests * 1e6, "statuses": statuses}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.requests)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, stages in (("validation only", ""), ("contact_guard", None)):
+            env = dict(
+                os.environ,
+                DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'guard.db')}",
+                ENV="production", LOG_FILE="", SKIP_EMAIL="true", RATE_LIMIT_REQUESTS="100000000",
+                SQL_PROFILER_ENABLED="false",
+            )
+            if stages is not None:
+                env["CONTACT_GUARD_STAGES"] = stages
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", "--requests", str(args.requests)],
+                cwd=ROOT, env=env, check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(out.strip().splitlines()[-1])
+            print(f"{label:16} {result['cpu_us']:8.1f} us CPU per bot request   statuses {result['statuses']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Caller-side logging cost per request: the old synchronous StreamHandler +
+FileHandler setup versus log_setup's queue pipeline, with and without
+sampling. Each simulated request logs --lines records from --threads
+threads; "drain" is how long the listener needed to catch up afterwards.
+
+    python benchmarks/bench_logging.py --requests 20000 --threads 8
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import log_setup  # noqa: E402
+
+logger = logging.getLogger("routers.review")
+
+
+def simulate(requests: int, threads: int, lines: int) -> float:
+    per_thread = requests // threads
+
+    def worker(n):
+        for i in range(per_thread):
+            token = log_setup.request_id_var.set(f"req-{n}-{i}")
+            for line in range(lines):
+                logger.info("Received review", extra={"reviewer": "Jane Miller", "rating": 5, "line": line})
+            log_setup.request_id_var.reset(token)
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def report(label: str, elapsed: float, drain: float, requests: int):
+    print(f"{label:28} {elapsed / requests * 1e6:8.2f} us/request  drain {drain:6.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--lines", type=int, default=3, help="log records per request")
+    parser.add_argument("--queue-size", type=int, default=0, help="0 = unbounded, so nothing is dropped")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        devnull = open(os.devnull, "w")
+        root = logging.getLogger()
+
+        # The previous main.py setup: formatting and both writes on the request thread
+        handlers = [logging.StreamHandler(devnull), logging.FileHandler(os.path.join(tmp, "sync.log"))]
+        for handler in handlers:
+            handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+            root.addHandler(handler)
+        root.setLevel(logging.INFO)
+        report("sync stream+file (text)", simulate(args.requests, args.threads, args.lines), 0.0, args.requests)
+        for handler in handlers:
+            root.removeHandler(handler)
+            handler.close()
+
+        for label, rates in (("queue json", {}), ("queue json, sampled 10%", {"routers.review": 0.1})):
+            log_setup.configure_logging(
+                level="INFO", fmt="json", log_file=os.path.join(tmp, "queue.log"), sample_rates=rates, stream=devnull,
+                queue_size=args.queue_size,
+            )
+            elapsed = simulate(args.requests, args.threads, args.lines)
+            start = time.perf_counter()
+            log_setup.stop_logging()
+            report(label, elapsed, time.perf_counter() - start, args.requests)
+
+        print(f"records dropped on a full queue: {log_setup._DroppingQueueHandler.dropped}")
+        devnull.close()
+
+
+if __name__ == "__main__":
+    main()
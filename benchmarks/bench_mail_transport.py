@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Per-email latency of the pooled ResendHttpTransport versus a fresh
+connection per call (what a bare requests.post does), against the local
+stub API. Plain HTTP, so the real-world gap is larger: every fresh
+connection to Resend also pays a TLS handshake.
+
+    python benchmarks/bench_mail_transport.py --emails 500 --latency-ms 5
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mail_transport import ResendHttpTransport  # noqa: E402
+from stub_mail_server import start_stub_server  # noqa: E402
+
+PAYLOAD = {
+    "from": "Bench <bench@example.com>",
+    "to": ["owner@example.com"],
+    "subject": "Benchmark",
+    "html": "<p>hello</p>",
+    "text": "hello",
+}
+
+
+def timed(label: str, send, count: int):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        send(PAYLOAD)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    print(f"{label:14} p50 {statistics.median(samples) * 1000:6.2f} ms   "
+          f"p99 {samples[int(len(samples) * 0.99) - 1] * 1000:6.2f} ms   total {sum(samples):.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    server = start_stub_server(latency_ms=args.latency_ms)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def fresh_connection(payload):
+        response = requests.post(f"{base_url}/emails", json=payload, timeout=(3.05, 10),
+                                 headers={"Authorization": "Bearer re_bench", "Connection": "close"})
+        response.raise_for_status()
+
+    transport = ResendHttpTransport("re_bench", base_url=base_url)
+    timed("fresh conn", fresh_connection, args.emails)
+    timed("pooled", transport.send, args.emails)
+    transport.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
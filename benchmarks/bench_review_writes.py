@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Review insert throughput: --threads concurrent writers each inserting
+reviews the way create_review does (one transaction per review) versus
+handing them to write_coalescer's group-commit writer. Runs against a
+fresh SQLite file so every commit pays for a real fsync.
+
+    python benchmarks/bench_review_writes.py --reviews 2000 --threads 16
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def run(label: str, insert_one, reviews: int, threads: int):
+    per_thread = reviews // threads
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker(n):
+        local = []
+        for i in range(per_thread):
+            values = {
+                "name": f"Writer {n}", "text": f"Benchmark review {n}-{i} about the kitchen cabinets",
+                "rating": (i % 5) + 1, "spam_score": 0.0, "flagged": False,
+            }
+            start = time.perf_counter()
+            try:
+                insert_one(values)
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+                continue
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0
+    print(
+        f"{label:12} {len(latencies) / elapsed:8.0f} inserts/s   "
+        f"p50 {statistics.median(latencies) * 1000:6.2f} ms   p99 {p99 * 1000:6.2f} ms   errors {len(errors)}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'writes.db')}"
+        os.environ.setdefault("SQL_PROFILER_ENABLED", "false")
+
+        from database import Base, SessionLocal, engine
+        from models import Review
+        from review_stats import record_reviews_added
+        from write_coalescer import ReviewWriteCoalescer
+        Base.metadata.create_all(bind=engine)
+
+        def per_request_commit(values):
+            db = SessionLocal()
+            try:
+                review = Review(**values)
+                db.add(review)
+                db.flush()
+                record_reviews_added(db, [review.rating])
+                db.commit()
+                db.refresh(review)
+            finally:
+                db.close()
+
+        coalescer = ReviewWriteCoalescer(max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+
+        print(f"{args.reviews} reviews from {args.threads} threads")
+        run("per-request", per_request_commit, args.reviews, args.threads)
+        run("coalesced", coalescer.submit, args.reviews, args.threads)
+        coalescer.stop()
+        print(f"coalescer: {coalescer.stats()}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Per-review cost of review_scorer.score_review versus the original
+admin_cleanup loop (five uncompiled re.search calls per field).
+
+    python benchmarks/bench_scorer.py --reviews 100000
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from review_scorer import score_review  # noqa: E402
+
+ORIGINAL_PATTERNS = [
+    r'test|demo|sample|fake|dummy|example',
+    r'test review|sample review|fake review|demo review',
+    r'great work|amazing|excellent|wonderful|fantastic',
+    r'^.{1,20}$',
+    r'this is a test|testing|test message',
+]
+
+SAMPLES = [
+    ("Jane Miller", "Aaron rebuilt our back porch stairs and matched the old trim perfectly. Would hire again."),
+    ("Test User", "This is a test review for the site"),
+    ("Tom", "Great work on the kitchen cabinets, very clean install and on schedule."),
+    ("Sarah K", "Amazing job!!"),
+    ("Bill Ostrander", "Built-in shelves in the den came out better than the drawings. Fair price, tidy crew."),
+]
+
+
+def original_is_test(name: str, text: str) -> bool:
+    name, text = name.lower(), text.lower()
+    for pattern in ORIGINAL_PATTERNS:
+        if re.search(pattern, name) or re.search(pattern, text):
+            return True
+    return len(text) < 25 and any(word in text for word in ['good', 'great', 'nice', 'amazing'])
+
+
+def original_all_patterns(name: str, text: str) -> list:
+    # What the old code would cost to produce a score rather than stop at the first hit
+    name, text = name.lower(), text.lower()
+    return [pattern for pattern in ORIGINAL_PATTERNS if re.search(pattern, name) or re.search(pattern, text)]
+
+
+def bench(label: str, fn, reviews):
+    start = time.perf_counter()
+    for name, text in reviews:
+        fn(name, text)
+    elapsed = time.perf_counter() - start
+    print(f"{label:24} {elapsed / len(reviews) * 1e6:7.2f} us/review  ({len(reviews)} reviews in {elapsed:.2f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=100000)
+    args = parser.parse_args()
+
+    reviews = [random.choice(SAMPLES) for _ in range(args.reviews)]
+    bench("original (first match)", original_is_test, reviews)
+    bench("original (all patterns)", original_all_patterns, reviews)
+    bench("score_review", score_review, reviews)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Reproducible load test for the whole API.
+
+For each dataset size it seeds a SQLite database with ReviewCreate-valid
+reviews (deterministic for a given --seed), starts `uvicorn main:app` on it
+with the fake email transport, and drives a weighted mix of GET /reviews/,
+POST /reviews/, POST /contact/ and GET /health at a fixed concurrency.
+
+The report has per-endpoint p50/p95/p99 latency and error counts, overall
+throughput and the server's peak RSS. --output writes it as JSON; pass an
+earlier output as --baseline to fail (exit 1) on regressions beyond
+--tolerance. Needs httpx on top of requirements.txt.
+
+    python benchmarks/load_test.py --sizes 1k,100k --concurrency 50 --duration 20 --output run.json
+    python benchmarks/load_test.py --sizes 1k,100k --baseline run.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from schemas import ContactForm, ReviewCreate  # noqa: E402
+
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+DEFAULT_MIX = "list=70,create=10,contact=10,health=10"
+
+FIRST_NAMES = ["Jane", "Tom", "Sarah", "Bill", "Maria", "Dave", "Linda", "Greg", "Paula", "Ken"]
+LAST_NAMES = ["Miller", "Ostrander", "Kowalski", "Nguyen", "Brennan", "Schultz", "Harper", "Doyle"]
+PROJECTS = ["back porch", "kitchen cabinets", "built-in shelves", "stair railing", "mudroom bench", "deck"]
+REMARKS = [
+    "came out better than the drawings",
+    "was finished on schedule and the crew left the site tidy",
+    "matched the original trim perfectly",
+    "has held up through two winters without a problem",
+    "was priced fairly and explained clearly up front",
+]
+
+
+def review_row(rng: random.Random, i: int, start: datetime) -> tuple:
+    review = ReviewCreate(
+        name=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        text=f"The {rng.choice(PROJECTS)} {rng.choice(REMARKS)}. Job #{i}.",
+        rating=rng.choice([None, 3, 4, 4, 5, 5, 5]),
+    )
+    created_at = start + timedelta(seconds=i * 30 + rng.randint(0, 29))
+    return review.name, review.text, review.rating, created_at.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def seed_database(path: str, rows: int, seed: int):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{path}", RESEND_API_KEY="re_load_test")
+    subprocess.run([sys.executable, "init_db.py"], cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+
+    rng = random.Random(seed)
+    start = datetime(2020, 1, 1)
+    conn = sqlite3.connect(path)
+    batch = 50_000
+    for offset in range(0, rows, batch):
+        conn.executemany(
+            "INSERT INTO reviews (name, text, rating, created_at) VALUES (?, ?, ?, ?)",
+            (review_row(rng, i, start) for i in range(offset, min(rows, offset + batch))),
+        )
+        conn.commit()
+    # Let the app rebuild the summary row from the seeded data
+    conn.execute("DELETE FROM review_stats")
+    conn.commit()
+    conn.close()
+    subprocess.run(
+        [sys.executable, "-c", "from review_stats import ensure_stats; ensure_stats()"],
+        cwd=ROOT, env=env, check=True,
+    )
+
+
+def seeded_copy(cache_dir: str, work_dir: str, size: str, seed: int) -> str:
+    """Seed once per (size, seed) into cache_dir; every run gets a fresh copy since POSTs write"""
+    cached = os.path.join(cache_dir, f"reviews-{size}-seed{seed}.db")
+    if not os.path.exists(cached):
+        started = time.perf_counter()
+        seed_database(cached + ".tmp", SIZES[size], seed)
+        os.replace(cached + ".tmp", cached)
+        print(f"seeded {size} ({SIZES[size]} reviews) in {time.perf_counter() - started:.1f}s")
+    path = os.path.join(work_dir, f"run-{size}.db")
+    shutil.copyfile(cached, path)
+    return path
+
+
+def start_server(db_path: str, port: int, extra_env: dict) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{db_path}",
+        ENV="production",
+        LOG_FILE="",
+        LOG_LEVEL="WARNING",
+        EMAIL_SENDER="fake",
+        RESEND_API_KEY="re_load_test",
+        SKIP_EMAIL="false",
+        RATE_LIMIT_REQUESTS="1000000000",  # measure the endpoints, not the limiter
+    )
+    env.update(extra_env)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+
+
+def peak_rss_mb(pid: int):
+    """High-water resident set size of a process (Linux /proc); None elsewhere"""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+async def wait_ready(base_url: str, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{base_url}/livez")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in ("list", "create", "contact", "health"):
+            raise SystemExit(f"unknown endpoint in --mix: {name}")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def request_for(endpoint: str, rng: random.Random, i: int, list_query: str) -> tuple[str, str, dict]:
+    if endpoint == "list":
+        return "GET", f"/reviews/?{list_query}" if list_query else "/reviews/", {}
+    if endpoint == "create":
+        review = ReviewCreate(
+            name=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            text=f"The {rng.choice(PROJECTS)} {rng.choice(REMARKS)}. Load test #{i}.",
+            rating=rng.randint(1, 5),
+        )
+        return "POST", "/reviews/", {"json": review.model_dump()}
+    if endpoint == "contact":
+        form = ContactForm(
+            name=rng.choice(FIRST_NAMES),
+            email=f"load{i}@example.com",
+            message=f"Looking for a quote on a new {rng.choice(PROJECTS)} this spring.",
+        )
+        return "POST", "/contact/", {"json": form.model_dump()}
+    return "GET", "/health", {}
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile, in milliseconds"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), round(pct / 100 * len(sorted_values) + 0.5)))
+    return round(sorted_values[rank - 1] * 1000, 2)
+
+
+async def drive(base_url: str, concurrency: int, duration: float, mix: dict[str, float], seed: int,
+                list_query: str) -> dict:
+    names, weights = list(mix), list(mix.values())
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def worker(n: int):
+            rng = random.Random(seed * 1000 + n)
+            i = 0
+            while time.monotonic() < stop_at:
+                endpoint = rng.choices(names, weights)[0]
+                method, path, kwargs = request_for(endpoint, rng, n * 1_000_000 + i, list_query)
+                i += 1
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, path, **kwargs)
+                    failed = response.status_code >= 400
+                except httpx.HTTPError:
+                    failed = True
+                latencies[endpoint].append(time.perf_counter() - start)
+                if failed:
+                    errors[endpoint] += 1
+
+        stop_at = time.monotonic() + duration
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    endpoints = {}
+    for name in names:
+        values = sorted(latencies[name])
+        endpoints[name] = {
+            "requests": len(values),
+            "errors": errors[name],
+            "p50_ms": percentile(values, 50),
+            "p95_ms": percentile(values, 95),
+            "p99_ms": percentile(values, 99),
+        }
+    total = sum(len(values) for values in latencies.values())
+    return {
+        "requests": total,
+        "errors": sum(errors.values()),
+        "throughput_rps": round(total / elapsed, 1),
+        "endpoints": endpoints,
+    }
+
+
+def run_size(size: str, args, cache_dir: str, work_dir: str) -> dict:
+    db_path = seeded_copy(cache_dir, work_dir, size, args.seed)
+    server = start_server(db_path, args.port, dict(item.split("=", 1) for item in args.env))
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        asyncio.run(wait_ready(base_url))
+        if args.warmup:
+            asyncio.run(drive(base_url, args.concurrency, args.warmup, args.mix, args.seed + 1, args.list_query))
+        result = asyncio.run(drive(base_url, args.concurrency, args.duration, args.mix, args.seed, args.list_query))
+        result["peak_rss_mb"] = peak_rss_mb(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+    result["rows"] = SIZES[size]
+    return result
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Human-readable regressions of current vs baseline (same sizes and endpoints only)"""
+    problems = []
+    for size, result in current["results"].items():
+        base = baseline.get("results", {}).get(size)
+        if not base:
+            continue
+        if result["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            problems.append(f"{size}: throughput {result['throughput_rps']} rps < baseline {base['throughput_rps']} rps")
+        if result.get("peak_rss_mb") and base.get("peak_rss_mb") and result["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            problems.append(f"{size}: peak RSS {result['peak_rss_mb']} MB > baseline {base['peak_rss_mb']} MB")
+        for endpoint, stats in result["endpoints"].items():
+            base_stats = base["endpoints"].get(endpoint)
+            if not base_stats:
+                continue
+            for key in ("p95_ms", "p99_ms"):
+                if stats[key] > base_stats[key] * (1 + tolerance):
+                    problems.append(f"{size} {endpoint}: {key} {stats[key]} > baseline {base_stats[key]}")
+            if stats["errors"] > base_stats["errors"]:
+                problems.append(f"{size} {endpoint}: {stats['errors']} errors (baseline {base_stats['errors']})")
+    return problems
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_result(size: str, result: dict):
+    print(f"\n{size}: {result['requests']} requests, {result['throughput_rps']} rps, "
+          f"{result['errors']} errors, peak RSS {result['peak_rss_mb']} MB")
+    for endpoint, stats in result["endpoints"].items():
+        print(f"  {endpoint:8} n={stats['requests']:<7} p50 {stats['p50_ms']:8.2f} ms  "
+              f"p95 {stats['p95_ms']:8.2f} ms  p99 {stats['p99_ms']:8.2f} ms  errors {stats['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1k", help=f"comma-separated, from {', '.join(SIZES)}")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=15, help="seconds of measured load per size")
+    parser.add_argument("--warmup", type=float, default=3, help="seconds of unmeasured load first")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"endpoint weights (default {DEFAULT_MIX})")
+    parser.add_argument("--list-query", default="limit=20",
+                        help='query string for GET /reviews/; "" requests the unpaginated full list')
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--cache-dir", default=os.path.join(tempfile.gettempdir(), "oldweiler-load-test"),
+                        help="where seeded databases are kept between runs")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE", help="extra server environment")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative regression")
+    args = parser.parse_args()
+
+    sizes = [size.strip().lower() for size in args.sizes.split(",")]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        raise SystemExit(f"unknown size(s): {', '.join(unknown)}")
+    os.makedirs(args.cache_dir, exist_ok=True)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "mix": args.mix,
+            "seed": args.seed,
+            "list_query": args.list_query,
+            "env": args.env,
+        },
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as work_dir:
+        for size in sizes:
+            report["results"][size] = run_size(size, args, args.cache_dir, work_dir)
+            print_result(size, report["results"][size])
+
+    if args.output:
+        with open(args.output, "w") as out:
+            json.dump(report, out, indent=2)
+        print(f"\nwrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(report, json.load(f), args.tolerance)
+        if problems:
+            print(f"\nRegressions vs {args.baseline} (tolerance {args.tolerance:.0%}):")
+            for problem in problems:
+                print(f"  - {problem}")
+            sys.exit(1)
+        print(f"\nNo regressions vs {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
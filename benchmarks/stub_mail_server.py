@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Resend API (POST /emails).
+
+Accepts JSON payloads and answers {"id": ...} after an optional delay, with
+an optional failure rate, so the mail transport and outbox can be tested
+and benchmarked offline:
+
+    python benchmarks/stub_mail_server.py --port 8025 --latency-ms 80 --fail-rate 0.05
+    RESEND_API_URL=http://127.0.0.1:8025 RESEND_API_KEY=re_stub uvicorn main:app
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubMailHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+    latency = 0.0
+    fail_rate = 0.0
+    received = 0
+    _lock = threading.Lock()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.latency:
+            time.sleep(self.latency)
+        if self.path != "/emails":
+            return self._reply(404, {"message": "not found"})
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return self._reply(422, {"message": "invalid JSON"})
+        if not payload.get("to") or not payload.get("from"):
+            return self._reply(422, {"message": "missing from/to"})
+        if random.random() < self.fail_rate:
+            return self._reply(500, {"message": "stub failure"})
+        with self._lock:
+            type(self).received += 1
+        self._reply(200, {"id": str(uuid.uuid4())})
+
+    def _reply(self, status: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(port: int = 0, latency_ms: float = 0, fail_rate: float = 0) -> ThreadingHTTPServer:
+    """Start the stub on a background thread; server.server_address[1] is the bound port"""
+    handler = type("Handler", (StubMailHandler,), {"latency": latency_ms / 1000, "fail_rate": fail_rate, "received": 0})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--fail-rate", type=float, default=0)
+    args = parser.parse_args()
+
+    server = start_stub_server(args.port, args.latency_ms, args.fail_rate)
+    print(f"Stub mail API listening on http://127.0.0.1:{server.server_address[1]}/emails")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"received {server.RequestHandlerClass.received} emails")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
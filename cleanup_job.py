@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Batch cleanup job - remove test/spam reviews from whatever DATABASE_URL points at
+
+Scans reviews in id order, one keyset chunk at a time, scores each chunk
+with review_scorer (in a process pool for large tables), and deletes the
+matches with one batched DELETE ... WHERE id IN (...) per chunk, keeping
+the review_stats summary in the same transaction.
+
+Deleting requires an explicit --min-score; a dry run defaults to the
+flagging threshold so you can see what a given score would remove first.
+
+    python cleanup_job.py --dry-run
+    python cleanup_job.py --since 2025-01-01 --min-score 5
+    python cleanup_job.py --max-rows 500000 --workers 4 --min-score 5
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Iterator, Optional
+from sqlalchemy import delete, func, select
+from database import engine, SessionLocal, sqlite_timestamp
+from models import Review
+from review_scorer import SPAM_FLAG_THRESHOLD, score_review
+from review_stats import record_reviews_removed
+
+DEFAULT_CHUNK_SIZE = 2000
+# Below this many rows, forking worker processes costs more than it saves
+PROCESS_POOL_MIN_ROWS = 50000
+
+_COLUMNS = (Review.id, Review.name, Review.text, Review.rating, Review.flagged, Review.created_at)
+
+
+def iter_review_chunks(chunk_size: int = DEFAULT_CHUNK_SIZE, since: Optional[datetime] = None,
+                       max_rows: Optional[int] = None) -> Iterator[list[dict]]:
+    """Yield reviews as lists of dicts in id order, one keyset page at a time"""
+    last_id = 0
+    remaining = max_rows
+    while remaining is None or remaining > 0:
+        size = chunk_size if remaining is None else min(chunk_size, remaining)
+        stmt = select(*_COLUMNS).where(Review.id > last_id).order_by(Review.id).limit(size)
+        if since is not None:
+            bound = sqlite_timestamp(since) if engine.dialect.name == "sqlite" else since
+            stmt = stmt.where(Review.created_at >= bound)
+        with engine.connect() as conn:
+            rows = [dict(row._mapping) for row in conn.execute(stmt)]
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1]["id"]
+        if remaining is not None:
+            remaining -= len(rows)
+
+
+def score_batch(batch: list[tuple[int, str, str]]) -> list[tuple[int, int, tuple[str, ...]]]:
+    """(id, name, text) -> (id, score, reasons); top-level so worker processes can run it"""
+    return [(review_id, *score_review(name, text)) for review_id, name, text in batch]
+
+
+def find_matches(rows: list[dict], min_score: int, executor: Optional[ProcessPoolExecutor] = None,
+                 workers: int = 1) -> list[dict]:
+    """Rows scoring at least min_score, annotated with spam_score/reasons"""
+    batch = [(row["id"], row["name"], row["text"]) for row in rows]
+    if executor is not None and len(batch) > workers:
+        step = -(-len(batch) // workers)
+        scored = [item for part in executor.map(score_batch, [batch[i:i + step] for i in range(0, len(batch), step)])
+                  for item in part]
+    else:
+        scored = score_batch(batch)
+
+    by_id = {row["id"]: row for row in rows}
+    matches = []
+    for review_id, score, reasons in scored:
+        if score >= min_score:
+            matches.append(dict(by_id[review_id], spam_score=score, reasons=reasons))
+    return matches
+
+
+def delete_reviews(reviews: list[dict]) -> int:
+    """Delete the given reviews in one transaction and adjust the summary stats"""
+    if not reviews:
+        return 0
+    db = SessionLocal()
+    try:
+        result = db.execute(delete(Review).where(Review.id.in_([review["id"] for review in reviews])))
+        record_reviews_removed(db, [review["rating"] for review in reviews if not review["flagged"]])
+        db.commit()
+        return result.rowcount
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def count_reviews(since: Optional[datetime] = None) -> int:
+    stmt = select(func.count()).select_from(Review)
+    if since is not None:
+        stmt = stmt.where(Review.created_at >= (sqlite_timestamp(since) if engine.dialect.name == "sqlite" else since))
+    with engine.connect() as conn:
+        return conn.execute(stmt).scalar_one()
+
+
+def run(dry_run: bool = False, since: Optional[datetime] = None, max_rows: Optional[int] = None,
+        min_score: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+        workers: Optional[int] = None, verbose: bool = True) -> dict:
+    if min_score is None:
+        if not dry_run:
+            raise ValueError("min_score is required when deleting reviews")
+        min_score = SPAM_FLAG_THRESHOLD
+    total = count_reviews(since)
+    if max_rows is not None:
+        total = min(total, max_rows)
+    if workers is None:
+        workers = 4 if total >= PROCESS_POOL_MIN_ROWS else 1
+
+    print(f"🧹 Cleanup job: {total} reviews to scan, min score {min_score}, "
+          f"chunk {chunk_size}, {workers} worker(s){' (dry run)' if dry_run else ''}")
+
+    scanned = matched = deleted = 0
+    start = time.perf_counter()
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for rows in iter_review_chunks(chunk_size, since, max_rows):
+            matches = find_matches(rows, min_score, executor, workers)
+            scanned += len(rows)
+            matched += len(matches)
+            if verbose:
+                for review in matches:
+                    print(f"   - #{review['id']} {review['name']}: {review['text'][:50]} "
+                          f"(score {review['spam_score']}: {', '.join(review['reasons'])})")
+            if not dry_run:
+                deleted += delete_reviews(matches)
+
+            elapsed = time.perf_counter() - start
+            rate = scanned / elapsed if elapsed else 0.0
+            print(f"   {scanned}/{total} scanned ({scanned / total * 100 if total else 100:.1f}%), "
+                  f"{matched} matched, {deleted} deleted, {rate:,.0f} rows/s", file=sys.stderr)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        "scanned": scanned,
+        "matched": matched,
+        "deleted": deleted,
+        "seconds": round(elapsed, 2),
+        "rows_per_second": round(scanned / elapsed, 1) if elapsed else None,
+    }
+    print(f"✅ Done: {summary}")
+    return summary
+
+
+def parse_since(value: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected an ISO date or datetime, got {value!r}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Remove test/spam reviews in batches")
+    parser.add_argument("--dry-run", action="store_true", help="Report matches without deleting")
+    parser.add_argument("--since", type=parse_since, help="Only reviews created at or after this ISO date/datetime")
+    parser.add_argument("--max-rows", type=int, help="Stop after scanning this many reviews")
+    parser.add_argument("--min-score", type=int,
+                        help=f"Delete reviews scoring at least this; required unless --dry-run "
+                             f"(dry runs default to {SPAM_FLAG_THRESHOLD}; 1 = any heuristic match)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, help=f"Scoring processes (default: 4 when scanning {PROCESS_POOL_MIN_ROWS}+ rows)")
+    parser.add_argument("--quiet", action="store_true", help="Don't list each matched review")
+    args = parser.parse_args(argv)
+    if args.min_score is None and not args.dry_run:
+        parser.error("--min-score is required when deleting (try --dry-run first)")
+
+    run(
+        dry_run=args.dry_run,
+        since=args.since,
+        max_rows=args.max_rows,
+        min_score=args.min_score,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        verbose=not args.quiet,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Per-route concurrency limits with load shedding.
+
+Blocking handlers run on AnyIO's shared threadpool, so a slow database or
+mail API used to tie up every thread and make /, /health and everything
+else queue behind it. Routes now declare a pool through the
+concurrency_limit dependency: "db" for the review routes and /contact/
+(which only writes outbox rows), "email" for /send-email, which calls the
+mail API inline. Each pool admits at most `limit` requests at a time and
+queues the rest on the event loop, where waiting costs no thread.
+
+A request is shed with a 503 and Retry-After instead of queueing when
+  - the pool's queue already holds max_queue requests, or
+  - it has waited max_wait_ms for a slot.
+Retry-After is estimated from the queue depth and the pool's recent
+average hold time, so it grows with the backlog.
+
+Queue depth, slots in use and shed counts are exported as metrics and
+listed in /health.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+from fastapi import HTTPException
+from metrics import concurrency_in_use, concurrency_queue_depth, concurrency_shed_total
+
+logger = logging.getLogger(__name__)
+
+CONCURRENCY_LIMITS_ENABLED = os.getenv("CONCURRENCY_LIMITS_ENABLED", "true").lower() == "true"
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40"))  # AnyIO's default; shared by every sync handler
+
+# Keep limit(db) + limit(email) below THREADPOOL_SIZE so unpooled routes always find a thread
+CONCURRENCY_DB_LIMIT = int(os.getenv("CONCURRENCY_DB_LIMIT", "16"))
+CONCURRENCY_DB_MAX_QUEUE = int(os.getenv("CONCURRENCY_DB_MAX_QUEUE", "64"))
+CONCURRENCY_DB_MAX_WAIT_MS = float(os.getenv("CONCURRENCY_DB_MAX_WAIT_MS", "2000"))
+CONCURRENCY_EMAIL_LIMIT = int(os.getenv("CONCURRENCY_EMAIL_LIMIT", "8"))
+CONCURRENCY_EMAIL_MAX_QUEUE = int(os.getenv("CONCURRENCY_EMAIL_MAX_QUEUE", "32"))
+CONCURRENCY_EMAIL_MAX_WAIT_MS = float(os.getenv("CONCURRENCY_EMAIL_MAX_WAIT_MS", "5000"))
+
+# Weight of the newest hold time in the moving average used for Retry-After
+_HOLD_TIME_ALPHA = 0.2
+
+
+class Overloaded(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class ConcurrencyPool:
+    """Admission control for one class of work; only used from the event loop, so no locks"""
+
+    def __init__(self, name: str, limit: int, max_queue: int, max_wait_ms: float):
+        self.name = name
+        self.limit = max(1, limit)
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max_wait_ms / 1000
+        self.in_use = 0
+        self.shed = {"queue_full": 0, "queue_timeout": 0}
+        self.avg_hold = 0.0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        # Time for the requests ahead to drain through `limit` slots, at least a second
+        backlog = (self.queued + 1) / self.limit
+        return max(1, math.ceil(backlog * self.avg_hold))
+
+    def _shed(self, reason: str):
+        self.shed[reason] += 1
+        concurrency_shed_total.inc(self.name, reason)
+        raise Overloaded(reason, self.retry_after())
+
+    async def acquire(self):
+        if self.in_use < self.limit and not self._waiters:
+            self.in_use += 1
+            concurrency_in_use.inc(self.name)
+            return
+        if self.queued >= self.max_queue:
+            self._shed("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        concurrency_queue_depth.inc(self.name)
+        try:
+            await asyncio.wait_for(waiter, self.max_wait)
+        except asyncio.TimeoutError:
+            # release() may have handed us the slot just as the timer fired
+            if not (waiter.done() and not waiter.cancelled()):
+                self._shed("queue_timeout")
+        except asyncio.CancelledError:
+            # Cancelled (e.g. client disconnect) after being handed a slot:
+            # pass it on, or it would never be released
+            if waiter.done() and not waiter.cancelled():
+                self._free()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            concurrency_queue_depth.dec(self.name)
+
+    def release(self, held: float):
+        """Free a slot held for `held` seconds"""
+        self.avg_hold += _HOLD_TIME_ALPHA * (held - self.avg_hold)
+        self._free()
+
+    def _free(self):
+        # Hand the slot straight to the oldest live waiter, so in_use is unchanged
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_use -= 1
+        concurrency_in_use.dec(self.name)
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_use": self.in_use,
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            "max_wait_ms": self.max_wait * 1000,
+            "avg_hold_ms": round(self.avg_hold * 1000, 1),
+            "shed": dict(self.shed),
+        }
+
+
+pools = {
+    "db": ConcurrencyPool("db", CONCURRENCY_DB_LIMIT, CONCURRENCY_DB_MAX_QUEUE, CONCURRENCY_DB_MAX_WAIT_MS),
+    "email": ConcurrencyPool("email", CONCURRENCY_EMAIL_LIMIT, CONCURRENCY_EMAIL_MAX_QUEUE, CONCURRENCY_EMAIL_MAX_WAIT_MS),
+}
+
+
+def concurrency_limit(pool_name: str):
+    """Route dependency that holds a slot in the named pool for the rest of the request"""
+    pool = pools[pool_name]
+
+    async def limited():
+        if not CONCURRENCY_LIMITS_ENABLED:
+            yield
+            return
+        try:
+            await pool.acquire()
+        except Overloaded as e:
+            logger.warning(f"Shedding request: {pool_name} pool {e.reason}", extra={"pool": pool.stats()})
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy, please retry shortly.",
+                headers={"Retry-After": str(e.retry_after)},
+            )
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            pool.release(time.monotonic() - started)
+
+    return limited
+
+
+def configure_threadpool(size: int = THREADPOOL_SIZE):
+    """Resize AnyIO's default thread limiter; call from inside the running event loop"""
+    import anyio.to_thread
+    anyio.to_thread.current_default_thread_limiter().total_tokens = size
+
+
+def concurrency_stats() -> dict:
+    return {name: pool.stats() for name, pool in pools.items()} if CONCURRENCY_LIMITS_ENABLED else None
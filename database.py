@@ -1,24 +1,143 @@
+import logging
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from datetime import datetime, timezone
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
+from starlette.requests import Request
+from query_profiler import SQL_PROFILER_ENABLED, install_query_profiler
+
+logger = logging.getLogger(__name__)
 
 # Get database URL from environment variable, default to SQLite for development
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./oldweiler.db")
 
-# Create engine based on database type
-if DATABASE_URL.startswith("sqlite"):
-    # SQLite configuration for development
-    engine = create_engine(
-        DATABASE_URL, connect_args={"check_same_thread": False}
-    )
-else:
-    # PostgreSQL/other databases for production
-    engine = create_engine(DATABASE_URL)
+# Connection pool tuning
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))  # Connections kept open
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))  # Extra connections allowed under burst
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # Seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Reopen connections older than this (seconds, -1 disables)
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_WARMUP_CONNECTIONS = int(os.getenv("DB_WARMUP_CONNECTIONS", "2"))  # Opened and pinged at startup (0 disables)
+
+# Read replicas: comma-separated URLs; reads that can tolerate lag use get_read_db
+DATABASE_READ_URLS = [url.strip() for url in os.getenv("DATABASE_READ_URLS", "").split(",") if url.strip()]
+REPLICA_EJECT_SECONDS = float(os.getenv("REPLICA_EJECT_SECONDS", "30"))  # How long a failing replica is skipped
+PRIMARY_PIN_SECONDS = int(os.getenv("PRIMARY_PIN_SECONDS", "10"))  # Reads stay on the primary this long after a write
+PRIMARY_PIN_COOKIE = "db_primary_until"
+PRIMARY_PIN_HEADER = "X-DB-Primary-Until"  # Same value as the cookie, for clients that can't send cross-site cookies
+
+# Async engine (SQLAlchemy asyncio extension), used by the reviews router when DB_ASYNC=true
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() == "true"
+
+# SQLite pragmas
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that also records how long checkouts wait for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+
+# SQLAlchemy names a pool's logger after its class's module, so this one lives
+# outside the "sqlalchemy" hierarchy (which SQLAlchemy defaults to WARNING) and
+# would log every checkout/checkin whenever the root logger is at DEBUG
+logging.getLogger(f"{__name__}.{InstrumentedQueuePool.__name__}").setLevel(logging.WARNING)
+
+
+def _pool_options():
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def _is_sqlite_memory(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers run alongside the single writer instead of blocking
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    if not _is_sqlite_memory(DATABASE_URL):
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.close()
+
+
+def _create_engine(url: str):
+    # Create engine based on database type
+    if url.startswith("sqlite"):
+        # SQLite configuration for development
+        sqlite_options = {} if _is_sqlite_memory(url) else _pool_options()
+        new_engine = create_engine(url, connect_args={"check_same_thread": False}, **sqlite_options)
+        event.listen(new_engine, "connect", _set_sqlite_pragmas)
+    else:
+        # PostgreSQL/other databases for production
+        new_engine = create_engine(url, **_pool_options())
+
+    if SQL_PROFILER_ENABLED:
+        install_query_profiler(new_engine)
+    return new_engine
+
+
+engine = _create_engine(DATABASE_URL)
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+class ReadSession(Session):
+    """Picks a replica (or the primary) on first use, so a request answered
+    from cache never checks out a connection"""
+
+    def get_bind(self, mapper=None, **kwargs):
+        if "bind" not in self.info:
+            self.info["bind"] = _choose_read_bind(self)
+        return self.info["bind"]
+
+    def close(self):
+        super().close()
+        connection = self.info.pop("connection", None)
+        if connection is not None:
+            connection.close()
+
+
+ReadSessionLocal = sessionmaker(class_=ReadSession, autocommit=False, autoflush=False)
+
 # Create Base class
 Base = declarative_base()
 
@@ -28,4 +147,212 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+class ReplicaSet:
+    """Round-robin over replica engines, skipping any that failed in the last REPLICA_EJECT_SECONDS"""
+
+    def __init__(self, urls: list[str], eject_seconds: float = REPLICA_EJECT_SECONDS):
+        self.urls = urls
+        self.engines = [_create_engine(url) for url in urls]
+        self.eject_seconds = eject_seconds
+        self.ejected_until = [0.0] * len(urls)
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def healthy(self, now: float) -> list[int]:
+        """Indexes of usable replicas, starting with the next one in rotation"""
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % max(1, len(self.engines))
+        order = [(start + i) % len(self.engines) for i in range(len(self.engines))]
+        return [i for i in order if self.ejected_until[i] <= now]
+
+    def eject(self, index: int, error: Exception):
+        self.ejected_until[index] = time.time() + self.eject_seconds
+        logger.warning(f"Read replica {index} ejected for {self.eject_seconds:.0f}s: {error}")
+
+    def status(self) -> list[dict]:
+        now = time.time()
+        return [
+            {"replica": i, "healthy": self.ejected_until[i] <= now, "pool": type(engine.pool).__name__}
+            for i, engine in enumerate(self.engines)
+        ]
+
+
+replicas = ReplicaSet(DATABASE_READ_URLS) if DATABASE_READ_URLS else None
+
+
+# Monotonic time of this process's last write; see _recent_write
+_last_write = float("-inf")
+
+
+def pin_to_primary(response):
+    """Send this client's reads to the primary for PRIMARY_PIN_SECONDS, so it sees its own write"""
+    global _last_write
+    if replicas is not None:
+        _last_write = time.monotonic()
+        until = str(int(time.time()) + PRIMARY_PIN_SECONDS)
+        # The frontend calls the API cross-site, so the cookie must be SameSite=None
+        # (and therefore Secure); the header covers browsers that block it anyway
+        response.set_cookie(
+            PRIMARY_PIN_COOKIE, until, max_age=PRIMARY_PIN_SECONDS, httponly=True, samesite="none", secure=True,
+        )
+        response.headers[PRIMARY_PIN_HEADER] = until
+
+
+def _pinned(request) -> bool:
+    value = request.headers.get(PRIMARY_PIN_HEADER) or request.cookies.get(PRIMARY_PIN_COOKIE, 0)
+    try:
+        until = float(value)
+    except ValueError:
+        return False
+    # The value comes from the client: anything later than pin_to_primary ever
+    # issues (including inf; nan fails every comparison) is ignored, so a
+    # scraper can't route itself to the primary and past the cache for good
+    now = time.time()
+    return now < until <= now + PRIMARY_PIN_SECONDS
+
+
+def _recent_write() -> bool:
+    # Replicas may still lag a write made this recently, and anything read now
+    # can end up in the shared response cache, so read from the primary
+    return time.monotonic() - _last_write < PRIMARY_PIN_SECONDS
+
+
+def _choose_read_bind(db: Session):
+    """A connection on a healthy replica, or the primary engine when the session
+    must read its own writes, replicas lag a recent write, or all are down"""
+    if replicas is not None and not db.info["pinned"] and not _recent_write():
+        for index in replicas.healthy(time.time()):
+            try:
+                # Connect here so a dead replica is skipped rather than failing the request
+                connection = replicas.engines[index].connect()
+            except DBAPIError as e:
+                replicas.eject(index, e)
+                continue
+            db.info["replica"] = index
+            db.info["connection"] = connection
+            return connection
+    db.info["replica"] = None
+    return engine
+
+
+def _read_session(pinned: bool = False) -> Session:
+    """Session that reads from a replica when it can; it connects only when first used"""
+    return ReadSessionLocal(info={"pinned": pinned, "replica": None})
+
+
+# Dependency for read-only endpoints that can tolerate replica lag
+def get_read_db(request: Request):
+    db = _read_session(pinned=replicas is not None and _pinned(request))
+    try:
+        yield db
+    except DBAPIError as e:
+        if db.info["replica"] is not None and (e.connection_invalidated or isinstance(e, OperationalError)):
+            replicas.eject(db.info["replica"], e)
+        raise
+    finally:
+        db.close()
+
+
+def sqlite_timestamp(value: datetime) -> str:
+    """Format a datetime the way SQLite's CURRENT_TIMESTAMP stores it (UTC text)
+
+    Bind this instead of a datetime when comparing against or inserting into
+    SQLite timestamp columns; SQLAlchemy's own format adds microseconds and
+    would not compare correctly against server-default values.
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    fmt = "%Y-%m-%d %H:%M:%S.%f" if value.microsecond else "%Y-%m-%d %H:%M:%S"
+    return value.strftime(fmt)
+
+
+def async_database_url(url: str) -> str:
+    """Swap the sync driver for its asyncio counterpart (aiosqlite / asyncpg)"""
+    scheme, sep, rest = url.partition("://")
+    driver = {
+        "sqlite": "sqlite+aiosqlite",
+        "postgres": "postgresql+asyncpg",
+        "postgresql": "postgresql+asyncpg",
+        "postgresql+psycopg2": "postgresql+asyncpg",
+    }.get(scheme, scheme)
+    return f"{driver}{sep}{rest}"
+
+
+_async_engine = None
+_AsyncSessionLocal = None
+
+
+def get_async_engine():
+    """Create the async engine on first use so the sync-only path never imports a driver"""
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        url = async_database_url(DATABASE_URL)
+        if DATABASE_URL.startswith("sqlite"):
+            _async_engine = create_async_engine(url)
+            event.listen(_async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+        else:
+            options = _pool_options()
+            options.pop("poolclass")
+            _async_engine = create_async_engine(url, **options)
+        # expire_on_commit=False: attribute access after commit can't lazy-load in async code
+        if SQL_PROFILER_ENABLED:
+            install_query_profiler(_async_engine.sync_engine)
+        _AsyncSessionLocal = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+
+# Dependency to get an async database session
+async def get_async_db():
+    get_async_engine()
+    async with _AsyncSessionLocal() as db:
+        yield db
+
+
+def pool_stats() -> dict:
+    """Live connection pool numbers for /health and capacity planning"""
+    pool = engine.pool
+    stats = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),
+            "max_overflow": DB_MAX_OVERFLOW,
+            "timeout_seconds": DB_POOL_TIMEOUT,
+        })
+    if isinstance(pool, InstrumentedQueuePool):
+        with pool._stats_lock:
+            stats.update({
+                "checkouts": pool.checkouts,
+                "checkout_timeouts": pool.timeouts,
+                "wait_avg_ms": round(pool.wait_total / pool.checkouts * 1000, 3) if pool.checkouts else 0.0,
+                "wait_max_ms": round(pool.wait_max * 1000, 3),
+            })
+    return stats
+
+
+def warm_pool(connections: int = DB_WARMUP_CONNECTIONS) -> int:
+    """Open and ping up to `connections` pooled connections so the first requests don't pay for connect/auth"""
+    pool = engine.pool
+    if isinstance(pool, QueuePool):
+        connections = min(connections, pool.size())
+    else:
+        connections = min(connections, 1)
+    # Hold them all at once; checking out one at a time would keep reusing the same connection
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = engine.connect()
+            opened.append(conn)
+            conn.execute(text("SELECT 1"))
+    finally:
+        for conn in opened:
+            conn.close()
+    return len(opened)
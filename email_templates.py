@@ -0,0 +1,122 @@
+"""
+Email bodies as string.Template objects.
+
+Company details are substituted once when EmailTemplates is built; each
+send only fills in the submitter's fields. Everything placed into HTML is
+escaped first, so a contact message can't inject markup into the owner's
+inbox or the customer's confirmation.
+"""
+
+from html import escape
+from string import Template
+from typing import Iterable
+
+OWNER_HTML = Template(
+    "<p><strong>Name:</strong> $name</p>"
+    "<p><strong>Email:</strong> $email</p>"
+    "<p><strong>Message:</strong></p>"
+    "<p>$message</p>"
+)
+
+OWNER_TEXT = Template(
+    "Name: $name\n"
+    "Email: $email\n"
+    "Message:\n$message"
+)
+
+CONFIRMATION_HTML = Template("""
+    <div style="font-family: Arial, sans-serif; padding: 20px; background-color: #f9fafb; color: #111;">
+      <h2 style="color: #2563eb;">Thanks for reaching out, $name!</h2>
+      <p style="font-size: 16px; line-height: 1.6;">
+        We've received your message and appreciate you taking the time to get in touch.
+        I'll be reviewing your request soon and will follow up with you as quickly as possible.
+      </p>
+      
+      <div style="background-color: #eff6ff; border-left: 4px solid #2563eb; padding: 15px; margin: 20px 0; border-radius: 4px;">
+        <h3 style="color: #1e40af; margin-top: 0;">While You Wait:</h3>
+        <p style="margin-bottom: 15px;">
+          <strong>📱 Call or Text:</strong> <a href="tel:+15857345068" style="color: #2563eb; text-decoration: none;">(585) 734-5068</a>
+        </p>
+        <p style="margin-bottom: 15px;">
+          <strong>🌐 View My Work:</strong> <a href="https://oldweilercustomcarpentry.com/projects" style="color: #2563eb; text-decoration: none;">Browse Recent Projects</a>
+        </p>
+        <p style="margin-bottom: 0;">
+          <strong>📸 Gallery:</strong> <a href="https://oldweilercustomcarpentry.com/gallery" style="color: #2563eb; text-decoration: none;">See Finished Work</a>
+        </p>
+      </div>
+      
+      <div style="background-color: #f3f4f6; border: 1px solid #d1d5db; padding: 15px; margin: 20px 0; border-radius: 4px;">
+        <h3 style="color: #374151; margin-top: 0;">Your Message:</h3>
+        <p style="font-style: italic; color: #4b5563; margin: 0;">"$message"</p>
+      </div>
+      
+      <p style="font-size: 16px; line-height: 1.6;">
+        I typically respond within 48 hours, but feel free to reach out directly if you have urgent questions.
+      </p>
+      
+      <p style="margin-top: 30px;">— Aaron Oldweiler<br/>$company_name</p>
+      <hr style="margin: 30px 0;" />
+      <p style="font-size: 14px; color: #666;">Based in $company_location — serving the surrounding areas</p>
+    </div>
+""")
+
+CONFIRMATION_TEXT = Template(
+    "Hi $name,\n\n"
+    "Thanks for reaching out! Your message has been received, and I'll be in touch soon.\n\n"
+    "While you wait:\n"
+    "📱 Call or Text: (585) 734-5068\n"
+    "🌐 View My Work: https://oldweilercustomcarpentry.com/projects\n"
+    "📸 Gallery: https://oldweilercustomcarpentry.com/gallery\n\n"
+    "Your Message:\n"
+    '"$message"\n\n'
+    "I typically respond within 48 hours, but feel free to reach out directly if you have urgent questions.\n\n"
+    "— Aaron Oldweiler\n$company_name"
+)
+
+DIGEST_ITEM_HTML = Template(
+    '<div style="border-bottom: 1px solid #d1d5db; padding: 12px 0;">'
+    '<p><strong>$name</strong> &lt;<a href="mailto:$email">$email</a>&gt;</p>'
+    "<p>$message</p>"
+    "</div>"
+)
+
+DIGEST_ITEM_TEXT = Template("$name <$email>\n$message\n")
+
+
+def _bind(template: Template, **values) -> Template:
+    """Pre-fill the fields that never change per message"""
+    return Template(template.safe_substitute(**values))
+
+
+class EmailTemplates:
+    def __init__(self, company_name: str, company_location: str):
+        self.confirmation_html = _bind(
+            CONFIRMATION_HTML, company_name=escape(company_name), company_location=escape(company_location)
+        )
+        self.confirmation_text = _bind(CONFIRMATION_TEXT, company_name=company_name)
+
+    @staticmethod
+    def _escaped(name: str, email: str, message: str) -> dict:
+        return {"name": escape(name), "email": escape(email), "message": escape(message)}
+
+    def owner(self, name: str, email: str, message: str) -> tuple[str, str]:
+        """(html, text) for a single owner notification"""
+        return (
+            OWNER_HTML.substitute(self._escaped(name, email, message)),
+            OWNER_TEXT.substitute(name=name, email=email, message=message),
+        )
+
+    def confirmation(self, name: str, message: str) -> tuple[str, str]:
+        """(html, text) for the customer's confirmation"""
+        return (
+            self.confirmation_html.substitute(name=escape(name), message=escape(message)),
+            self.confirmation_text.substitute(name=name, message=message),
+        )
+
+    def digest(self, submissions: Iterable[dict]) -> tuple[str, str]:
+        """(html, text) combining several submissions ({name, email, message}) into one owner email"""
+        html_parts, text_parts = [], []
+        for item in submissions:
+            html_parts.append(DIGEST_ITEM_HTML.substitute(self._escaped(item["name"], item["email"], item["message"])))
+            text_parts.append(DIGEST_ITEM_TEXT.substitute(name=item["name"], email=item["email"], message=item["message"]))
+        return "".join(html_parts), "\n".join(text_parts)
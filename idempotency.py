@@ -0,0 +1,343 @@
+"""
+Idempotency-Key support for retried POSTs.
+
+The first request carrying a given key runs normally and its response is
+stored; later requests with the same key get that response back without
+running the handler again (no validation, no insert, no emails). A
+duplicate that arrives while the original is still running waits for it.
+Reusing a key with a different body is rejected with 422.
+
+Bodies over max_body_bytes are rejected with 413 before anything is
+buffered past the cap or claimed in the store.
+
+Responses that say "try again" are not stored: 5xx, 408 (timeout), 409
+(conflict) and 429 (rate limited). The key is released instead, so a retry
+after the condition clears actually runs.
+
+Stores:
+  MemoryStore - per-process, LRU-bounded, entries expire after the TTL (default)
+  SQLStore    - a table on the app database or a standalone SQLite file,
+                so every worker shares the keys
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+from sqlalchemy import create_engine, delete, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from models import IdempotencyRecord
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 255
+
+STATUS_IN_FLIGHT = "in_flight"
+STATUS_DONE = "done"
+
+# Statuses below 500 that a client is expected to retry
+_RETRYABLE_STATUSES = {408, 409, 429}
+
+# Per-request headers that must not be replayed
+_UNSTORED_HEADERS = {b"x-request-id", b"server-timing", b"date", b"retry-after"}
+
+
+class StoredResponse(NamedTuple):
+    status: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+
+
+class Claim(NamedTuple):
+    outcome: str  # "new", "replay", "in_flight" or "mismatch"
+    response: Optional[StoredResponse] = None
+
+
+class MemoryStore:
+    """In-process store; holds at most max_keys entries, least recently used evicted first"""
+
+    blocking = False
+
+    def __init__(self, ttl: float, lock_timeout: float, max_keys: int = 10000):
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.max_keys = max_keys
+        # key -> (fingerprint, status, expires_at, response)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def begin(self, key: str, fingerprint: str, now: float) -> Claim:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] > now:
+                self._entries.move_to_end(key)
+                stored_fingerprint, status, _, response = entry
+                if stored_fingerprint != fingerprint:
+                    return Claim("mismatch")
+                if status == STATUS_DONE:
+                    return Claim("replay", response)
+                return Claim("in_flight")
+
+            self._entries[key] = (fingerprint, STATUS_IN_FLIGHT, now + self.lock_timeout, None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+            return Claim("new")
+
+    def complete(self, key: str, fingerprint: str, response: StoredResponse, now: float):
+        with self._lock:
+            self._entries[key] = (fingerprint, STATUS_DONE, now + self.ttl, response)
+
+    def release(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLStore:
+    """Shared store on a SQL table; the primary key decides which worker runs the original"""
+
+    blocking = True
+    PURGE_EVERY = 1000
+
+    def __init__(self, engine: Engine, ttl: float, lock_timeout: float):
+        self.engine = engine
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self._claims = 0
+        IdempotencyRecord.__table__.create(bind=engine, checkfirst=True)
+
+    def _insert(self, conn, key: str, fingerprint: str, now: float) -> bool:
+        table = IdempotencyRecord.__table__
+        values = {"key": key, "fingerprint": fingerprint, "status": STATUS_IN_FLIGHT, "expires_at": now + self.lock_timeout}
+        dialect = self.engine.dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            result = conn.execute(insert(table).values(**values).on_conflict_do_nothing(index_elements=["key"]))
+            return result.rowcount == 1
+        try:
+            with conn.begin_nested():
+                conn.execute(table.insert().values(**values))
+            return True
+        except IntegrityError:
+            return False
+
+    def begin(self, key: str, fingerprint: str, now: float) -> Claim:
+        table = IdempotencyRecord.__table__
+        with self.engine.begin() as conn:
+            if self._insert(conn, key, fingerprint, now):
+                claim = Claim("new")
+            else:
+                row = conn.execute(
+                    select(table.c.fingerprint, table.c.status, table.c.expires_at,
+                           table.c.response_status, table.c.response_headers, table.c.response_body)
+                    .where(table.c.key == key)
+                ).one_or_none()
+                if row is None:
+                    # Released between our insert and select; the caller simply tries again
+                    claim = Claim("in_flight")
+                elif row.expires_at <= now:
+                    # Expired: take it over unless another worker just did
+                    result = conn.execute(
+                        update(table)
+                        .where(table.c.key == key, table.c.expires_at == row.expires_at)
+                        .values(fingerprint=fingerprint, status=STATUS_IN_FLIGHT, expires_at=now + self.lock_timeout,
+                                response_status=None, response_headers=None, response_body=None)
+                    )
+                    claim = Claim("new") if result.rowcount == 1 else Claim("in_flight")
+                elif row.fingerprint != fingerprint:
+                    claim = Claim("mismatch")
+                elif row.status == STATUS_DONE:
+                    headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in json.loads(row.response_headers)]
+                    claim = Claim("replay", StoredResponse(row.response_status, headers, bytes(row.response_body)))
+                else:
+                    claim = Claim("in_flight")
+
+        self._claims += 1
+        if self._claims % self.PURGE_EVERY == 0:
+            self.purge(now)
+        return claim
+
+    def complete(self, key: str, fingerprint: str, response: StoredResponse, now: float):
+        headers = json.dumps([(name.decode("latin-1"), value.decode("latin-1")) for name, value in response.headers])
+        with self.engine.begin() as conn:
+            conn.execute(
+                update(IdempotencyRecord.__table__)
+                .where(IdempotencyRecord.key == key)
+                .values(status=STATUS_DONE, expires_at=now + self.ttl, response_status=response.status,
+                        response_headers=headers, response_body=response.body)
+            )
+
+    def release(self, key: str):
+        with self.engine.begin() as conn:
+            conn.execute(delete(IdempotencyRecord.__table__).where(IdempotencyRecord.key == key))
+
+    def purge(self, now: float):
+        with self.engine.begin() as conn:
+            conn.execute(delete(IdempotencyRecord.__table__).where(IdempotencyRecord.expires_at < now))
+
+
+def build_idempotency_store(store_url: str, ttl: float, lock_timeout: float, max_keys: int = 10000):
+    """store_url: "memory", "database" (the app's DATABASE_URL) or a sqlite:/// file URL"""
+    if store_url == "memory":
+        store = MemoryStore(ttl, lock_timeout, max_keys=max_keys)
+    elif store_url == "database":
+        from database import engine
+        store = SQLStore(engine, ttl, lock_timeout)
+    elif store_url.startswith("sqlite"):
+        store = SQLStore(create_engine(store_url, connect_args={"check_same_thread": False, "timeout": 5}), ttl, lock_timeout)
+    else:
+        raise ValueError(f"Unsupported IDEMPOTENCY_STORE: {store_url}")
+    logger.info(f"Idempotency store: {type(store).__name__}")
+    return store
+
+
+async def _json_response(send, status: int, detail: str, extra_headers: list = ()):
+    body = json.dumps({"detail": detail}).encode()
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    await send({"type": "http.response.start", "status": status, "headers": headers + list(extra_headers)})
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    """Applies Idempotency-Key handling to the given (method, path) pairs"""
+
+    def __init__(self, app, store, routes: set[tuple[str, str]], wait_timeout: float = 10.0,
+                 max_body_bytes: int = 65536):
+        self.app = app
+        self.store = store
+        self.routes = routes
+        self.wait_timeout = wait_timeout
+        self.max_body_bytes = max_body_bytes
+        # Wakes duplicates waiting in this process as soon as the original finishes;
+        # duplicates on other workers notice on their next poll
+        self._finished: dict[str, asyncio.Event] = {}
+
+    async def _call_store(self, method, *args):
+        if self.store.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (scope["method"], scope["path"]) not in self.routes:
+            await self.app(scope, receive, send)
+            return
+        client_key = dict(scope["headers"]).get(b"idempotency-key")
+        if client_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not client_key or len(client_key) > MAX_KEY_LENGTH:
+            await _json_response(send, 400, f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+            return
+
+        # Buffer the body (up to the cap): it is fingerprinted, then handed to the app unchanged
+        too_large = f"Request body exceeds {self.max_body_bytes} bytes"
+        declared = dict(scope["headers"]).get(b"content-length")
+        if declared is not None and (not declared.isdigit() or int(declared) > self.max_body_bytes):
+            await _json_response(send, 413, too_large)
+            return
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > self.max_body_bytes:
+                await _json_response(send, 413, too_large)
+                return
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                break
+        body = b"".join(chunks)
+        fingerprint = hashlib.sha256(body).hexdigest()
+        key = f"{scope['method']} {scope['path']} {client_key.decode('latin-1')}"
+
+        deadline = time.monotonic() + self.wait_timeout
+        delay = 0.02
+        while True:
+            claim = await self._call_store(self.store.begin, key, fingerprint, time.time())
+            if claim.outcome != "in_flight":
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                await _json_response(
+                    send, 409, "A request with this Idempotency-Key is still being processed", [(b"retry-after", b"1")]
+                )
+                return
+            event = self._finished.get(key)
+            try:
+                if event is not None:
+                    await asyncio.wait_for(event.wait(), min(delay, remaining))
+                else:
+                    await asyncio.sleep(min(delay, remaining))
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, 0.5)
+
+        if claim.outcome == "mismatch":
+            await _json_response(send, 422, "Idempotency-Key was already used with a different request body")
+            return
+        if claim.outcome == "replay":
+            response = claim.response
+            await send({
+                "type": "http.response.start",
+                "status": response.status,
+                "headers": response.headers + [(b"idempotent-replayed", b"true")],
+            })
+            await send({"type": "http.response.body", "body": response.body})
+            return
+
+        finished = asyncio.Event()
+        self._finished[key] = finished
+        await self._run_original(scope, body, send, key, fingerprint, finished)
+
+    async def _run_original(self, scope, body: bytes, send, key: str, fingerprint: str, finished: asyncio.Event):
+        delivered = False
+
+        async def replay_receive():
+            nonlocal delivered
+            if not delivered:
+                delivered = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # The body has been consumed; block like a live connection would
+            await asyncio.Event().wait()
+
+        start = {}
+        response_chunks = []
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                response_chunks.append(message.get("body", b""))
+            await send(message)
+
+        stored = False
+        try:
+            await self.app(scope, replay_receive, capture_send)
+            status = start.get("status", 500)
+            if status < 500 and status not in _RETRYABLE_STATUSES:
+                headers = [(name, value) for name, value in start.get("headers", [])
+                           if name.lower() not in _UNSTORED_HEADERS and not name.lower().startswith(b"ratelimit-")]
+                response = StoredResponse(status, headers, b"".join(response_chunks))
+                await self._call_store(self.store.complete, key, fingerprint, response, time.time())
+                stored = True
+        finally:
+            if not stored:
+                await self._call_store(self.store.release, key)
+            # A request that took over our expired claim has registered its own event
+            if self._finished.get(key) is finished:
+                del self._finished[key]
+            finished.set()
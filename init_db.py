@@ -1,10 +1,39 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
 from database import engine
 from models import Review
+from review_stats import ensure_stats
+from search import install_search_index
 
 # Create all tables
 def init_db():
     Review.metadata.create_all(bind=engine)
+    add_missing_columns()
+    create_missing_indexes()
+    ensure_stats()
+    install_search_index(engine)
     print("Database tables created successfully!")
 
+# Columns added to a model after its table was created (e.g. reviews.flagged);
+# they all carry server defaults, so existing rows get sensible values
+def add_missing_columns():
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Review.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+
+# create_all skips tables that already exist, so add any indexes declared
+# after the table was first created
+def create_missing_indexes():
+    for table in Review.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
 if __name__ == "__main__":
-    init_db() 
\ No newline at end of file
+    init_db() 
@@ -0,0 +1,199 @@
+"""
+Outbound email transport.
+
+ResendHttpTransport talks to the Resend REST API over one persistent
+requests.Session (pooled keep-alive connections, explicit connect/read
+timeouts) behind a circuit breaker. After CIRCUIT_FAILURE_THRESHOLD
+consecutive failures it fails fast for CIRCUIT_RESET_TIMEOUT seconds,
+then lets a single probe through to decide whether to close again.
+
+requests is imported when the Resend transport is first built, not when
+this module is, so importing the app stays cheap.
+
+Point RESEND_API_URL at benchmarks/stub_mail_server.py to test or
+benchmark without touching Resend, or set EMAIL_SENDER=fake to keep
+messages in memory.
+"""
+
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+from metrics import observe_email_send
+
+logger = logging.getLogger(__name__)
+
+RESEND_API_URL = os.getenv("RESEND_API_URL", "https://api.resend.com").rstrip("/")
+EMAIL_CONNECT_TIMEOUT = float(os.getenv("EMAIL_CONNECT_TIMEOUT", "3.05"))
+EMAIL_READ_TIMEOUT = float(os.getenv("EMAIL_READ_TIMEOUT", "10"))
+EMAIL_POOL_SIZE = int(os.getenv("EMAIL_POOL_SIZE", "10"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("EMAIL_CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("EMAIL_CIRCUIT_RESET_TIMEOUT", "30"))
+
+
+class EmailDeliveryError(Exception):
+    """The provider rejected or failed to accept a message"""
+
+
+class CircuitOpenError(EmailDeliveryError):
+    """Raised without calling the provider while the breaker is open"""
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD, reset_timeout: float = CIRCUIT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    raise CircuitOpenError("Email circuit open; failing fast")
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    raise CircuitOpenError("Email circuit half-open; probe already in flight")
+                self._probe_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Email circuit closed")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Email circuit opened after {self.failures} failure(s)")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self.failures}
+
+
+class MailTransport(ABC):
+    """Sends one provider payload ({from, to, subject, html, text, ...}); callable for outbox senders"""
+
+    @abstractmethod
+    def send(self, payload: dict) -> dict:
+        """Deliver the payload and return the provider's response"""
+
+    def __call__(self, payload: dict) -> dict:
+        """send() with latency and errors recorded in metrics"""
+        start = time.perf_counter()
+        try:
+            result = self.send(payload)
+        except Exception as e:
+            observe_email_send(time.perf_counter() - start, e)
+            raise
+        observe_email_send(time.perf_counter() - start)
+        return result
+
+    def close(self):
+        pass
+
+
+class ResendHttpTransport(MailTransport):
+    def __init__(self, api_key: str, base_url: str = RESEND_API_URL,
+                 connect_timeout: float = EMAIL_CONNECT_TIMEOUT, read_timeout: float = EMAIL_READ_TIMEOUT,
+                 pool_size: int = EMAIL_POOL_SIZE, breaker: Optional[CircuitBreaker] = None):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.url = f"{base_url}/emails"
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        # No transparent retries: the outbox owns retry policy
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"})
+
+    def send(self, payload: dict) -> dict:
+        import requests
+
+        self.breaker.before_call()
+        try:
+            response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        except requests.RequestException as e:
+            self.breaker.record_failure()
+            raise EmailDeliveryError(f"Email API request failed: {e}") from e
+
+        if response.status_code >= 500 or response.status_code == 429:
+            self.breaker.record_failure()
+            raise EmailDeliveryError(f"Email API error {response.status_code}: {response.text[:200]}")
+        # Any other answer means the provider is up, even if it rejected this payload
+        self.breaker.record_success()
+        if response.status_code >= 400:
+            raise EmailDeliveryError(f"Email API rejected message {response.status_code}: {response.text[:200]}")
+        return response.json()
+
+    def close(self):
+        self.session.close()
+
+
+class FakeTransport(MailTransport):
+    """Keeps payloads in memory instead of calling Resend.
+
+    Set fail_times to make the first N sends raise, to exercise retries.
+    """
+
+    def __init__(self, fail_times: int = 0):
+        self.sent: list[dict] = []
+        self.fail_times = fail_times
+        self._lock = threading.Lock()
+
+    def send(self, payload: dict) -> dict:
+        with self._lock:
+            if self.fail_times > 0:
+                self.fail_times -= 1
+                raise EmailDeliveryError("simulated send failure")
+            self.sent.append(payload)
+            return {"id": f"fake-{len(self.sent)}"}
+
+
+_transport: Optional[MailTransport] = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> MailTransport:
+    """Process-wide transport picked by EMAIL_SENDER: "resend" (default) or "fake" """
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                if os.getenv("EMAIL_SENDER", "resend").lower() == "fake":
+                    _transport = FakeTransport()
+                else:
+                    api_key = os.getenv("RESEND_API_KEY")
+                    if not api_key:
+                        raise EmailDeliveryError("Missing RESEND_API_KEY in environment variables")
+                    _transport = ResendHttpTransport(api_key)
+    return _transport
+
+
+def set_transport(transport: Optional[MailTransport]):
+    """Swap the process-wide transport (tests, benchmarks)"""
+    global _transport
+    with _transport_lock:
+        if _transport is not None and _transport is not transport:
+            _transport.close()
+        _transport = transport
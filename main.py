@@ -1,60 +1,139 @@
 import os
-import logging
 import time
-from collections import defaultdict
+
+# Startup phase timings (ms), logged once the app is serving and shown in /health
+startup_timings = {}
+_import_started = time.perf_counter()
+
+from dotenv import load_dotenv
+
+# Before the imports below, which read their settings at import time
+load_dotenv()
+
+import asyncio
+import logging
+import uuid
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from routers import review, send_email
 from schemas import ContactForm
 from routers import contact
+from rate_limit import build_rate_limiter
+from probes import readiness_probe
+from log_setup import configure_logging, request_id_var
+from metrics import MetricsMiddleware, registry
+from query_profiler import SQL_PROFILER_ENABLED, QueryProfilerMiddleware
+from idempotency import IdempotencyMiddleware, build_idempotency_store
+from contact_guard import DEFAULT_STAGES, ContactGuardMiddleware, build_stages
+from concurrency import concurrency_stats, configure_threadpool
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO if os.getenv("ENV") == "production" else logging.DEBUG,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler("app.log") if os.getenv("ENV") == "production" else None
-    ]
-)
+startup_timings["imports_ms"] = round((time.perf_counter() - _import_started) * 1000, 1)
+_setup_started = time.perf_counter()
+
+# Configure logging (queue-backed, JSON lines; see log_setup.py)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Rate limiting configuration
 RATE_LIMIT_REQUESTS = int(os.getenv("RATE_LIMIT_REQUESTS", "10"))  # Max requests per window
 RATE_LIMIT_WINDOW = int(os.getenv("RATE_LIMIT_WINDOW", "3600"))  # Time window in seconds (default: 1 hour)
+RATE_LIMIT_STORE = os.getenv("RATE_LIMIT_STORE", "memory")  # memory, database, or a sqlite:/// file shared by workers
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))  # Memory cap for the in-process store
 
-# In-memory storage for rate limiting (simple but effective)
-request_counts = defaultdict(list)
+rate_limiter = build_rate_limiter(RATE_LIMIT_REQUESTS, RATE_LIMIT_WINDOW, RATE_LIMIT_STORE, RATE_LIMIT_MAX_KEYS)
 
-def check_rate_limit(request: Request):
-    """Check if request exceeds rate limit"""
-    client_ip = request.client.host
-    current_time = time.time()
-    
-    # Clean old requests outside the time window
-    request_counts[client_ip] = [
-        req_time for req_time in request_counts[client_ip] 
-        if current_time - req_time < RATE_LIMIT_WINDOW
-    ]
-    
-    # Check if limit exceeded
-    if len(request_counts[client_ip]) >= RATE_LIMIT_REQUESTS:
-        logger.warning(f"Rate limit exceeded for IP: {client_ip}")
-        raise HTTPException(
-            status_code=429, 
-            detail=f"Rate limit exceeded. Maximum {RATE_LIMIT_REQUESTS} requests per {RATE_LIMIT_WINDOW} seconds."
-        )
-    
-    # Add current request
-    request_counts[client_ip].append(current_time)
+# Pre-validation checks for POST /contact/, run in this order (see contact_guard.py)
+CONTACT_GUARD_STAGES = [name.strip() for name in os.getenv("CONTACT_GUARD_STAGES", ",".join(DEFAULT_STAGES)).split(",") if name.strip()]
+CONTACT_MAX_BODY_BYTES = int(os.getenv("CONTACT_MAX_BODY_BYTES", "8192"))  # Well above the largest valid form
+
+contact_guard_stages = build_stages(CONTACT_GUARD_STAGES, CONTACT_MAX_BODY_BYTES, rate_limiter)
+
+# Idempotency-Key configuration (POST /reviews/ and /contact/)
+IDEMPOTENCY_STORE = os.getenv("IDEMPOTENCY_STORE", "memory")  # memory, database, or a sqlite:/// file shared by workers
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))  # How long a stored response is replayed (seconds)
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))  # Memory cap for the in-process store
+IDEMPOTENCY_LOCK_TIMEOUT = float(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", "60"))  # In-flight claim expiry, e.g. after a crash
+IDEMPOTENCY_WAIT_TIMEOUT = float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", "10"))  # How long a duplicate waits before a 409
+IDEMPOTENCY_MAX_BODY_BYTES = int(os.getenv("IDEMPOTENCY_MAX_BODY_BYTES", "65536"))  # Largest body buffered for fingerprinting
+
+idempotency_store = build_idempotency_store(IDEMPOTENCY_STORE, IDEMPOTENCY_TTL, IDEMPOTENCY_LOCK_TIMEOUT, IDEMPOTENCY_MAX_KEYS)
 
-app = FastAPI(title="Oldweiler Custom Carpentry API", version="1.0.0")
+OUTBOX_WORKER_ENABLED = os.getenv("OUTBOX_WORKER_ENABLED", "true").lower() == "true"
+STARTUP_WARMUP_ENABLED = os.getenv("STARTUP_WARMUP_ENABLED", "true").lower() == "true"
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+def _warm_email_transport():
+    from mail_transport import EmailDeliveryError, get_transport
+    try:
+        get_transport()
+    except EmailDeliveryError as e:
+        # Not fatal: the app serves everything else and sends fail (and retry) until it's set
+        logger.warning(f"Email transport not configured: {e}")
+
+async def warm_up():
+    """Pre-open DB connections and build the email transport off the event loop, after the app is serving"""
+    from database import warm_pool
+
+    started = time.perf_counter()
+    try:
+        opened = await asyncio.to_thread(warm_pool)
+        startup_timings["warmup_db_ms"] = _elapsed_ms(started)
+        started = time.perf_counter()
+        await asyncio.to_thread(_warm_email_transport)
+        startup_timings["warmup_email_ms"] = _elapsed_ms(started)
+        logger.info(f"Warm-up done ({opened} DB connections)", extra={"startup_timings": startup_timings})
+    except Exception as e:
+        logger.warning(f"Warm-up failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    configure_threadpool()
+    readiness_probe.start()
+    if OUTBOX_WORKER_ENABLED:
+        import outbox
+        outbox.start_outbox_worker()
+    if not review.ADMIN_TOKEN and not review.ADMIN_OPEN_WITHOUT_TOKEN:
+        logger.warning("ADMIN_TOKEN is not set; /reviews/import, /export and /approve will answer 503")
+    startup_timings["background_start_ms"] = _elapsed_ms(started)
+    logger.info("Startup timings", extra={"startup_timings": startup_timings})
+
+    warmup = asyncio.create_task(warm_up()) if STARTUP_WARMUP_ENABLED else None
+    yield
+
+    if warmup is not None and not warmup.done():
+        warmup.cancel()
+    await readiness_probe.stop()
+    import outbox
+    outbox.stop_outbox_worker()
+    from write_coalescer import review_coalescer
+    if review_coalescer is not None:
+        review_coalescer.stop()
+
+app = FastAPI(title="Oldweiler Custom Carpentry API", version="1.0.0", lifespan=lifespan)
 
 # Get allowed origins from environment, default to development
 ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000").split(",")
 
 logger.info(f"Starting API with allowed origins: {ALLOWED_ORIGINS}")
-logger.info(f"Rate limiting: {RATE_LIMIT_REQUESTS} requests per {RATE_LIMIT_WINDOW} seconds")
+logger.info(f"Rate limiting: {RATE_LIMIT_REQUESTS} requests per {RATE_LIMIT_WINDOW} seconds ({RATE_LIMIT_STORE} store)")
+
+# Innermost, so replayed responses still get CORS, request ID and metrics
+app.add_middleware(
+    IdempotencyMiddleware,
+    store=idempotency_store,
+    routes={("POST", "/reviews/"), ("POST", "/contact/")},
+    wait_timeout=IDEMPOTENCY_WAIT_TIMEOUT,
+    max_body_bytes=IDEMPOTENCY_MAX_BODY_BYTES,
+)
+
+# Outside the idempotency middleware: bots are turned away before their body is
+# buffered, fingerprinted or claimed in the store, and rejections are never stored
+app.add_middleware(ContactGuardMiddleware, stages=contact_guard_stages, routes={("POST", "/contact/")})
 
 app.add_middleware(
     CORSMiddleware,
@@ -62,12 +141,41 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["RateLimit-Limit", "RateLimit-Remaining", "RateLimit-Reset", "RateLimit-Policy", "Retry-After", "X-Request-ID", "Server-Timing", "Idempotent-Replayed", "X-DB-Primary-Until"],
 )
 
+@app.middleware("http")
+async def assign_request_id(request: Request, call_next):
+    # Honour an upstream proxy's ID so log lines can be joined across hops
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+@app.middleware("http")
+async def add_rate_limit_headers(request: Request, call_next):
+    response = await call_next(request)
+    result = getattr(request.state, "rate_limit", None)
+    if result is not None:
+        response.headers.update(result.headers())
+    return response
+
+if SQL_PROFILER_ENABLED:
+    app.add_middleware(QueryProfilerMiddleware)
+
+# Outermost, so its timings include the other middleware
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(contact.router)
 app.include_router(review.router)
 app.include_router(send_email.router)
 
+startup_timings["app_setup_ms"] = _elapsed_ms(_setup_started)
+
 @app.get("/")
 def read_root():
     return {"message": "Hello from Oldweiler-Carpentry API!"}
@@ -76,17 +184,33 @@ def read_root():
 def test_api():
     return {"message": "Endpoint working! Yippeeee"}
 
+@app.get("/livez")
+async def liveness():
+    """Liveness probe: the process is up and the event loop is responsive (no I/O)"""
+    return {"status": "alive"}
+
+@app.get("/readyz")
+async def readiness():
+    """Readiness probe: serves the background dependency checks' cached result"""
+    ready, payload = readiness_probe.snapshot()
+    return JSONResponse(payload, status_code=200 if ready else 503)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of the in-process counters and histograms"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
-async def health_check():
+def health_check():
     """Health check endpoint for deployment platforms to monitor app status"""
-    import time
+    # Plain def so the blocking DB round trip runs in the threadpool, not on the event loop
     from sqlalchemy import text
     
     start_time = time.time()
     
     try:
         # Check database connection
-        from database import get_db
+        from database import get_db, pool_stats, replicas
         db = next(get_db())
         db.execute(text("SELECT 1"))  # Use text() for raw SQL
         db.close()
@@ -98,16 +222,21 @@ async def health_check():
             "timestamp": time.time(),
             "response_time_ms": response_time,
             "database": "connected",
+            "pool": pool_stats(),
+            "replicas": replicas.status() if replicas else None,
+            "startup_ms": startup_timings,
+            "concurrency": concurrency_stats(),
+            "review_writes": review.review_coalescer.stats() if review.review_coalescer else None,
             "version": "1.0.0"
         }
     except Exception as e:
         logger.error(f"Health check failed: {e}")
-        return {
+        return JSONResponse({
             "status": "unhealthy",
             "timestamp": time.time(),
             "error": str(e),
             "database": "disconnected"
-        }, 500
+        }, status_code=500)
 
 @app.get("/init-db")
 async def initialize_database():
@@ -115,9 +244,16 @@ async def initialize_database():
     try:
         from models import Review
         from database import engine
+        from init_db import add_missing_columns, create_missing_indexes
+        from review_stats import ensure_stats
+        from search import install_search_index
         
         # Create all tables
         Review.metadata.create_all(bind=engine)
+        add_missing_columns()
+        create_missing_indexes()
+        ensure_stats()
+        install_search_index(engine)
         
         logger.info("Database tables created successfully")
         return {
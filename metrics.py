@@ -0,0 +1,227 @@
+"""
+In-process metrics with a Prometheus text exposition.
+
+Each thread updates its own shard of every metric, so the hot path takes no
+locks: a dict lookup and an add. A scrape walks all shards and sums them.
+Shards of threads that have exited are kept, so counters never go backwards.
+
+MetricsMiddleware is a plain ASGI middleware (no BaseHTTPMiddleware task
+hop) that records per-route request counts, latency and in-flight requests.
+"""
+
+import bisect
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Iterable, Optional
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: list[dict] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            # Only taken once per thread, when it first touches this metric
+            with self._shards_lock:
+                self._shards.append(shard)
+            return shard
+
+    def _snapshots(self) -> list[list]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        # list(dict.items()) runs without releasing the GIL, so it can't see a
+        # dict mid-resize even while the owning thread keeps writing
+        return [list(shard.items()) for shard in shards]
+
+    def _labels(self, key: tuple, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    @abstractmethod
+    def _samples(self) -> list[str]:
+        """Exposition lines for every label set, after the HELP/TYPE header"""
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1.0):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0.0) + amount
+
+    def values(self) -> dict[tuple, float]:
+        totals: dict[tuple, float] = {}
+        for items in self._snapshots():
+            for key, value in items:
+                totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+    def _samples(self) -> list[str]:
+        return [f"{self.name}{self._labels(key)} {_number(value)}" for key, value in sorted(self.values().items())]
+
+
+class Gauge(Counter):
+    """Up/down value; per-thread shards still sum correctly when inc and dec happen on different threads"""
+
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels):
+        shard = self._shard()
+        # [count per bucket..., +Inf bucket, sum]
+        state = shard.get(labels)
+        if state is None:
+            state = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def _merged(self) -> dict[tuple, list]:
+        merged: dict[tuple, list] = {}
+        for items in self._snapshots():
+            for key, state in items:
+                state = list(state)
+                total = merged.get(key)
+                if total is None:
+                    merged[key] = state
+                else:
+                    for i, value in enumerate(state):
+                        total[i] += value
+        return merged
+
+    def _samples(self) -> list[str]:
+        lines = []
+        for key, state in sorted(self._merged().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{self._labels(key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_number(state[-1])}")
+            lines.append(f"{self.name}_count{self._labels(key)} {cumulative}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "HTTP requests by method, route template and status code", ("method", "route", "status")
+))
+http_request_duration_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by method and route template", ("method", "route")
+))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served"
+))
+rate_limit_rejections_total = registry.register(Counter(
+    "rate_limit_rejections_total", "Requests rejected by the contact rate limiter"
+))
+contact_guard_rejections_total = registry.register(Counter(
+    "contact_guard_rejections_total", "Contact form requests rejected, by the stage that rejected them", ("stage",)
+))
+concurrency_in_use = registry.register(Gauge(
+    "concurrency_in_use", "Requests holding a slot in each concurrency pool", ("pool",)
+))
+concurrency_queue_depth = registry.register(Gauge(
+    "concurrency_queue_depth", "Requests waiting for a slot in each concurrency pool", ("pool",)
+))
+concurrency_shed_total = registry.register(Counter(
+    "concurrency_shed_total", "Requests shed with a 503, by pool and reason", ("pool", "reason")
+))
+email_send_duration_seconds = registry.register(Histogram(
+    "email_send_duration_seconds", "Outbound email API call latency by outcome", ("outcome",),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+))
+email_send_errors_total = registry.register(Counter(
+    "email_send_errors_total", "Failed outbound email sends by exception type", ("error",)
+))
+
+
+def route_label(scope: dict) -> str:
+    """Route template ("/reviews/{review_id}") rather than the raw path, to keep label cardinality bounded"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+        http_requests_in_flight.inc()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec()
+            method, route = scope["method"], route_label(scope)
+            http_request_duration_seconds.observe(time.perf_counter() - start, method, route)
+            http_requests_total.inc(method, route, str(status_code))
+
+
+def observe_email_send(duration: float, error: Optional[BaseException] = None):
+    email_send_duration_seconds.observe(duration, "error" if error else "ok")
+    if error is not None:
+        email_send_errors_total.inc(type(error).__name__)
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime
-from sqlalchemy.sql import func
+from sqlalchemy import Boolean, Column, Integer, LargeBinary, String, Text, DateTime, Float, Index
+from sqlalchemy.sql import expression, func
 from database import Base 
 
 class Review(Base):
@@ -9,4 +9,70 @@ class Review(Base):
     name = Column(String(100), nullable=False)
     text = Column(Text, nullable=False)
     rating = Column(Integer, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Set on write by review_scorer; flagged reviews are hidden until approved
+    spam_score = Column(Integer, nullable=False, default=0, server_default="0")
+    flagged = Column(Boolean, nullable=False, default=False, server_default=expression.false())
+
+    __table_args__ = (
+        # Matches the public listing (unflagged, newest first) so keyset pages are index range scans
+        Index("ix_reviews_flagged_created_at_id", flagged, created_at.desc(), id.desc()),
+    )
+
+
+class ReviewStats(Base):
+    """Running totals over the reviews table, kept as a single row (id = 1)"""
+    __tablename__ = "review_stats"
+
+    id = Column(Integer, primary_key=True)
+    review_count = Column(Integer, nullable=False, default=0)
+    rated_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Integer, nullable=False, default=0)
+    stars_1 = Column(Integer, nullable=False, default=0)
+    stars_2 = Column(Integer, nullable=False, default=0)
+    stars_3 = Column(Integer, nullable=False, default=0)
+    stars_4 = Column(Integer, nullable=False, default=0)
+    stars_5 = Column(Integer, nullable=False, default=0)
+
+
+class EmailOutbox(Base):
+    """Outgoing email queued by request handlers and delivered by outbox.OutboxWorker"""
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), nullable=False)
+    payload = Column(Text, nullable=False)  # JSON-encoded provider payload
+    status = Column(String(20), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(Float, nullable=False)  # epoch seconds; doubles as the claim lease
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt", status, next_attempt_at),
+    )
+
+
+class RateLimitBucket(Base):
+    """Sliding-window counter state for one client, shared by all workers (rate_limit.SQLStore)"""
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String(255), primary_key=True)
+    window_start = Column(Float, nullable=False)
+    current_count = Column(Integer, nullable=False, default=0)
+    previous_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(Float, nullable=False, index=True)
+
+
+class IdempotencyRecord(Base):
+    """Stored first response for an Idempotency-Key, shared by all workers (idempotency.SQLStore)"""
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(400), primary_key=True)  # "METHOD path client-key"
+    fingerprint = Column(String(64), nullable=False)  # sha256 of the request body
+    status = Column(String(20), nullable=False)  # in_flight or done
+    response_status = Column(Integer, nullable=True)
+    response_headers = Column(Text, nullable=True)  # JSON list of [name, value]
+    response_body = Column(LargeBinary, nullable=True)
+    expires_at = Column(Float, nullable=False, index=True)  # lock expiry while in flight, TTL once done
@@ -0,0 +1,306 @@
+"""
+Durable email outbox.
+
+Request handlers add EmailOutbox rows in their own transaction and return
+right away. OutboxWorker runs in a background thread, claims due rows with
+a lease, and delivers them through a pluggable sender with bounded
+concurrency. Failed sends are retried with exponential backoff and moved
+to "dead" after OUTBOX_MAX_ATTEMPTS.
+
+With OWNER_DIGEST_ENABLED the contact form queues "owner_digest_item" rows
+instead of one owner email per submission. The worker leaves those alone
+until OWNER_DIGEST_MAX_BATCH are waiting or the oldest has waited
+OWNER_DIGEST_INTERVAL seconds, then sends them as a single combined email.
+Every worker can build digests, so items queued before the setting was
+switched off are still delivered: with digest mode off they go out on the
+next poll instead of waiting for the interval.
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", "4"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", "5"))  # seconds before the first retry
+OUTBOX_BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", "3600"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "2"))
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", "120"))
+
+OWNER_DIGEST_ENABLED = os.getenv("OWNER_DIGEST_ENABLED", "false").lower() == "true"
+OWNER_DIGEST_INTERVAL = float(os.getenv("OWNER_DIGEST_INTERVAL", "300"))  # seconds the oldest item may wait
+OWNER_DIGEST_MAX_BATCH = int(os.getenv("OWNER_DIGEST_MAX_BATCH", "25"))
+
+STATUS_PENDING = "pending"
+STATUS_SENT = "sent"
+STATUS_DEAD = "dead"
+
+KIND_DIGEST_ITEM = "owner_digest_item"
+
+Sender = Callable[[dict], object]
+DigestBuilder = Callable[[list[dict]], dict]
+
+
+def enqueue_email(db: Session, kind: str, payload: dict) -> EmailOutbox:
+    """Queue one email; it is delivered once the caller's transaction commits"""
+    message = EmailOutbox(
+        kind=kind,
+        payload=json.dumps(payload),
+        status=STATUS_PENDING,
+        attempts=0,
+        next_attempt_at=time.time(),
+    )
+    db.add(message)
+    return message
+
+
+def backoff_delay(attempts: int) -> float:
+    """Exponential backoff with up to 10% jitter, capped at OUTBOX_BACKOFF_MAX"""
+    delay = min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE * (2 ** max(attempts - 1, 0)))
+    return delay * (1 + random.random() * 0.1)
+
+
+def get_default_sender() -> Sender:
+    """Sends through the shared mail transport (Resend over pooled HTTP, or the fake one with
+    EMAIL_SENDER=fake), which is only built on the first delivery"""
+    from mail_transport import get_transport
+
+    def send(payload: dict):
+        return get_transport()(payload)
+    return send
+
+
+def get_default_digest_builder() -> DigestBuilder:
+    from routers.send_email import build_owner_digest
+    return build_owner_digest
+
+
+class OutboxWorker:
+    def __init__(
+        self,
+        sender: Sender,
+        session_factory=SessionLocal,
+        concurrency: int = OUTBOX_CONCURRENCY,
+        max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+        poll_interval: float = OUTBOX_POLL_INTERVAL,
+        digest_builder: Optional[DigestBuilder] = None,
+        digest_interval: float = OWNER_DIGEST_INTERVAL,
+        digest_max_batch: int = OWNER_DIGEST_MAX_BATCH,
+    ):
+        self.sender = sender
+        self.session_factory = session_factory
+        self.concurrency = max(1, concurrency)
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.digest_builder = digest_builder
+        self.digest_interval = digest_interval
+        self.digest_max_batch = max(1, digest_max_batch)
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="outbox-send")
+        self._thread = threading.Thread(target=self._run, name="outbox-worker", daemon=True)
+        self._thread.start()
+        logger.info(f"Outbox worker started (concurrency={self.concurrency})")
+
+    def stop(self, timeout: float = 10):
+        self._stopping.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+        if self._executor:
+            self._executor.shutdown(wait=True)
+        logger.info("Outbox worker stopped")
+
+    def wake(self):
+        """Skip the rest of the poll interval, e.g. right after an enqueue"""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                processed = self.run_once()
+            except Exception as e:
+                logger.error(f"Outbox poll failed: {e}")
+                processed = 0
+            # A full batch means there is probably more waiting
+            if processed < self.concurrency:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def run_once(self) -> int:
+        """Claim up to `concurrency` due messages and deliver them; returns how many"""
+        now = time.time()
+        digested = self._flush_digest(now)
+        claimed = self._claim(now)
+        if not claimed:
+            return digested
+        if self._executor:
+            list(self._executor.map(self._deliver, claimed))
+        else:
+            for item in claimed:
+                self._deliver(item)
+        return digested + len(claimed)
+
+    def _claim(self, now: float) -> list[tuple[int, str, int]]:
+        db = self.session_factory()
+        try:
+            due = db.execute(
+                select(EmailOutbox.id, EmailOutbox.payload, EmailOutbox.attempts, EmailOutbox.next_attempt_at)
+                .where(
+                    EmailOutbox.status == STATUS_PENDING,
+                    EmailOutbox.next_attempt_at <= now,
+                    EmailOutbox.kind != KIND_DIGEST_ITEM,
+                )
+                .order_by(EmailOutbox.next_attempt_at)
+                .limit(self.concurrency)
+            ).all()
+
+            claimed = self._lease(db, due, now)
+            db.commit()
+            return claimed
+        finally:
+            db.close()
+
+    @staticmethod
+    def _lease(db: Session, due, now: float) -> list[tuple[int, str, int]]:
+        claimed = []
+        for message_id, payload, attempts, next_attempt_at in due:
+            # Compare-and-set on next_attempt_at so only one worker process
+            # wins each row; the new value is the lease expiry.
+            result = db.execute(
+                update(EmailOutbox)
+                .where(EmailOutbox.id == message_id, EmailOutbox.next_attempt_at == next_attempt_at)
+                .values(next_attempt_at=now + OUTBOX_LEASE_SECONDS, attempts=attempts + 1)
+            )
+            if result.rowcount == 1:
+                claimed.append((message_id, payload, attempts + 1))
+        return claimed
+
+    def _flush_digest(self, now: float) -> int:
+        """Send waiting digest items as one owner email once the batch is full or old enough"""
+        db = self.session_factory()
+        try:
+            waiting = (
+                EmailOutbox.status == STATUS_PENDING,
+                EmailOutbox.kind == KIND_DIGEST_ITEM,
+                EmailOutbox.next_attempt_at <= now,
+            )
+            count, oldest, retries = db.execute(
+                select(func.count(), func.min(EmailOutbox.next_attempt_at), func.max(EmailOutbox.attempts))
+                .where(*waiting)
+            ).one()
+            # Items coming back from a failed send already waited out their backoff
+            if not count or (count < self.digest_max_batch and oldest > now - self.digest_interval and not retries):
+                return 0
+
+            due = db.execute(
+                select(EmailOutbox.id, EmailOutbox.payload, EmailOutbox.attempts, EmailOutbox.next_attempt_at)
+                .where(*waiting)
+                .order_by(EmailOutbox.next_attempt_at)
+                .limit(self.digest_max_batch)
+            ).all()
+            claimed = self._lease(db, due, now)
+            db.commit()
+        finally:
+            db.close()
+        if not claimed:
+            return 0
+
+        if self.digest_builder is None:
+            self.digest_builder = get_default_digest_builder()
+        try:
+            self.sender(self.digest_builder([json.loads(payload) for _, payload, _ in claimed]))
+        except Exception as e:
+            for message_id, _, attempts in claimed:
+                self._record_failure(message_id, attempts, e)
+            return len(claimed)
+
+        self._mark_sent([message_id for message_id, _, _ in claimed])
+        logger.info(f"Owner digest sent with {len(claimed)} submissions")
+        return len(claimed)
+
+    def _mark_sent(self, message_ids: list[int]):
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(EmailOutbox)
+                .where(EmailOutbox.id.in_(message_ids))
+                .values(status=STATUS_SENT, sent_at=func.now(), last_error=None)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _deliver(self, item: tuple[int, str, int]):
+        message_id, payload, attempts = item
+        try:
+            self.sender(json.loads(payload))
+        except Exception as e:
+            self._record_failure(message_id, attempts, e)
+            return
+        self._mark_sent([message_id])
+
+    def _record_failure(self, message_id: int, attempts: int, error: Exception):
+        values = {"last_error": str(error)[:1000]}
+        if attempts >= self.max_attempts:
+            values["status"] = STATUS_DEAD
+            logger.error(f"Outbox message {message_id} dead-lettered after {attempts} attempts: {error}")
+        else:
+            delay = backoff_delay(attempts)
+            values["next_attempt_at"] = time.time() + delay
+            logger.warning(f"Outbox message {message_id} failed (attempt {attempts}), retrying in {delay:.0f}s: {error}")
+
+        db = self.session_factory()
+        try:
+            db.execute(update(EmailOutbox).where(EmailOutbox.id == message_id).values(**values))
+            db.commit()
+        finally:
+            db.close()
+
+    def counts(self) -> dict:
+        """Outbox size per status, for monitoring"""
+        db = self.session_factory()
+        try:
+            rows = db.execute(select(EmailOutbox.status, func.count()).group_by(EmailOutbox.status)).all()
+            return {status: count for status, count in rows}
+        finally:
+            db.close()
+
+
+outbox_worker: Optional[OutboxWorker] = None
+
+
+def start_outbox_worker(sender: Optional[Sender] = None) -> OutboxWorker:
+    global outbox_worker
+    if outbox_worker is None:
+        outbox_worker = OutboxWorker(
+            sender or get_default_sender(),
+            digest_builder=get_default_digest_builder(),
+            # With digest mode off, drain items left from when it was on right away
+            digest_interval=OWNER_DIGEST_INTERVAL if OWNER_DIGEST_ENABLED else 0,
+        )
+    outbox_worker.start()
+    return outbox_worker
+
+
+def stop_outbox_worker():
+    if outbox_worker is not None:
+        outbox_worker.stop()
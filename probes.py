@@ -0,0 +1,112 @@
+"""
+Liveness and readiness probes.
+
+/livez never does I/O. /readyz serves the result of a background task that
+checks each dependency every READINESS_INTERVAL seconds on a worker thread,
+so a slow database never stalls the event loop or the probe itself.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+from typing import Callable, Optional
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+READINESS_INTERVAL = float(os.getenv("READINESS_INTERVAL", "5"))  # Seconds between background checks
+READINESS_TIMEOUT = float(os.getenv("READINESS_TIMEOUT", "2"))  # Per-dependency timeout
+READINESS_CHECK_EMAIL = os.getenv("READINESS_CHECK_EMAIL", "false").lower() == "true"
+EMAIL_API_HOST = os.getenv("EMAIL_API_HOST", "api.resend.com")
+
+
+def check_database():
+    from database import engine
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+def check_email_transport():
+    # A TCP connect is enough to tell whether the provider is reachable
+    with socket.create_connection((EMAIL_API_HOST, 443), timeout=READINESS_TIMEOUT):
+        pass
+
+
+class ReadinessProbe:
+    def __init__(self, checks: dict[str, Callable[[], None]], interval: float = READINESS_INTERVAL, timeout: float = READINESS_TIMEOUT):
+        self.checks = checks
+        self.interval = interval
+        self.timeout = timeout
+        self.results: dict[str, dict] = {}
+        self.checked_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run_check(self, name: str, check: Callable[[], None]) -> dict:
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.to_thread(check), self.timeout)
+            result = {"status": "ok"}
+        except asyncio.TimeoutError:
+            result = {"status": "error", "error": f"timed out after {self.timeout}s"}
+        except Exception as e:
+            result = {"status": "error", "error": str(e)}
+        result["latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        if result["status"] != "ok" and self.results.get(name, {}).get("status") != "error":
+            logger.error(f"Readiness check '{name}' failed: {result['error']}")
+        return result
+
+    async def check_once(self):
+        names = list(self.checks)
+        results = await asyncio.gather(*(self._run_check(name, self.checks[name]) for name in names))
+        self.results = dict(zip(names, results))
+        self.checked_at = time.time()
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.check_once()
+            except Exception as e:
+                logger.error(f"Readiness probe loop error: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> tuple[bool, dict]:
+        """(ready, payload) from the last completed round; stale or missing results are not ready"""
+        now = time.time()
+        if self.checked_at is None:
+            return False, {"status": "starting", "checks": {}}
+
+        age = now - self.checked_at
+        stale = age > self.interval * 3 + self.timeout
+        ready = not stale and all(result["status"] == "ok" for result in self.results.values())
+        return ready, {
+            "status": "ready" if ready else ("stale" if stale else "not_ready"),
+            "checked_at": self.checked_at,
+            "age_seconds": round(age, 3),
+            "checks": self.results,
+        }
+
+
+def build_readiness_probe() -> ReadinessProbe:
+    checks = {"database": check_database}
+    if READINESS_CHECK_EMAIL:
+        checks["email"] = check_email_transport
+    return ReadinessProbe(checks)
+
+
+readiness_probe = build_readiness_probe()
@@ -0,0 +1,155 @@
+"""
+Per-request SQL profiling.
+
+install_query_profiler() hooks before/after_cursor_execute on an engine.
+While a QueryStats is active in the current context (QueryProfilerMiddleware
+opens one per request) every statement adds to its count and total time and
+the slowest one is remembered. The middleware reports them in a
+Server-Timing header; anything slower than SLOW_QUERY_MS is logged.
+
+assert_max_queries() uses the same hooks to catch N+1 regressions (see
+tests/test_query_counts.py):
+
+    with assert_max_queries(1):
+        client.get("/reviews/")
+"""
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+SQL_PROFILER_ENABLED = os.getenv("SQL_PROFILER_ENABLED", "true").lower() == "true"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+
+
+class QueryStats:
+    def __init__(self, capture: bool = False):
+        self.count = 0
+        self.total = 0.0  # seconds
+        self.slowest = 0.0
+        self.slowest_statement: Optional[str] = None
+        # Full statement list only when asked for (assert_max_queries)
+        self.statements: Optional[list[str]] = [] if capture else None
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.total += duration
+        if duration > self.slowest:
+            self.slowest = duration
+            self.slowest_statement = statement
+        if self.statements is not None:
+            self.statements.append(statement)
+
+    def merge(self, other: "QueryStats"):
+        self.count += other.count
+        self.total += other.total
+        if other.slowest > self.slowest:
+            self.slowest, self.slowest_statement = other.slowest, other.slowest_statement
+        if self.statements is not None and other.statements is not None:
+            self.statements.extend(other.statements)
+
+    def server_timing(self) -> str:
+        return (
+            f'db;dur={self.total * 1000:.2f};desc="{self.count} queries", '
+            f"db-slowest;dur={self.slowest * 1000:.2f}"
+        )
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+# Open assert_max_queries blocks. A test client may run the app on another
+# thread, outside the caller's context, so the middleware hands each finished
+# request's stats to these as well.
+_collectors: list[QueryStats] = []
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_start"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, duration)
+    if duration * 1000 >= SLOW_QUERY_MS:
+        logger.warning(
+            f"Slow query ({duration * 1000:.1f} ms): {' '.join(statement.split())[:500]}",
+            extra={"duration_ms": round(duration * 1000, 1), "executemany": executemany},
+        )
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    # so the connection's stack doesn't grow by one per error
+    starts = context.connection.info.get("query_start") if context.connection is not None else None
+    if context.statement is not None and starts:
+        starts.pop()
+
+
+def install_query_profiler(engine):
+    """Attach the timing hooks; pass async engines' .sync_engine"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+@contextmanager
+def profile_queries(capture: bool = False):
+    """Collect stats for every statement run in this context (and threads/tasks started from it)"""
+    stats = QueryStats(capture)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit: int):
+    """Fail if the block (including HTTP requests it makes) runs more than `limit` statements, listing them"""
+    with profile_queries(capture=True) as stats:
+        _collectors.append(stats)
+        try:
+            yield stats
+        finally:
+            _collectors.remove(stats)
+    if stats.count > limit:
+        listing = "\n".join(f"  {i}. {' '.join(sql.split())}" for i, sql in enumerate(stats.statements, 1))
+        raise AssertionError(f"Expected at most {limit} queries, ran {stats.count}:\n{listing}")
+
+
+class QueryProfilerMiddleware:
+    """Opens a QueryStats per HTTP request and adds it to the response as Server-Timing"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with profile_queries(capture=bool(_collectors)) as stats:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start" and stats.count:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", stats.server_timing().encode("latin-1")))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                for collector in _collectors:
+                    collector.merge(stats)
@@ -0,0 +1,180 @@
+"""
+Sliding-window-counter rate limiting.
+
+Each key keeps two counters: requests in the current fixed window and in
+the previous one. The previous count is weighted by how much of it still
+overlaps the sliding window, which gives a close approximation of a true
+sliding log with O(1) work and O(1) memory per key.
+
+Stores:
+  MemoryStore - per-process, LRU-bounded, idle keys evicted (default)
+  SQLStore    - a table on the app database or a standalone SQLite file,
+                so every worker on a host shares one budget
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+from sqlalchemy import create_engine, delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.engine import Engine
+from models import RateLimitBucket
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    reset: int  # seconds until the current window rolls over
+    window: int
+
+    def headers(self) -> dict:
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(self.reset),
+            "RateLimit-Policy": f"{self.limit};w={self.window}",
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(self.reset)
+        return headers
+
+
+def advance_window(state: tuple[float, int, int], now: float, window: int) -> tuple[float, int, int]:
+    """Roll (window_start, current, previous) forward to the window containing now"""
+    window_start, current, previous = state
+    start = math.floor(now / window) * window
+    if window_start == start:
+        return state
+    if window_start == start - window:
+        return start, 0, current
+    return start, 0, 0
+
+
+def evaluate(state: tuple[float, int, int], now: float, window: int, limit: int):
+    """Apply one hit; returns (allowed, new_state, remaining, reset)"""
+    start, current, previous = advance_window(state, now, window)
+    overlap = 1 - (now - start) / window
+    estimate = previous * overlap + current
+    allowed = estimate + 1 <= limit
+    if allowed:
+        current += 1
+        estimate += 1
+    remaining = max(0, int(limit - estimate))
+    reset = max(1, math.ceil(start + window - now))
+    return allowed, (start, current, previous), remaining, reset
+
+
+class MemoryStore:
+    """In-process store; holds at most max_keys entries, least recently seen evicted first"""
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, tuple[float, int, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, now: float, window: int, limit: int):
+        with self._lock:
+            state = self._buckets.pop(key, (0.0, 0, 0))
+            allowed, state, remaining, reset = evaluate(state, now, window, limit)
+            self._buckets[key] = state
+
+            # Oldest entries sit at the front; anything two windows old holds
+            # no information, and the cap bounds memory under scanning traffic.
+            while self._buckets:
+                oldest_key, (oldest_start, _, _) = next(iter(self._buckets.items()))
+                if len(self._buckets) > self.max_keys or oldest_start < now - 2 * window:
+                    del self._buckets[oldest_key]
+                else:
+                    break
+            return allowed, remaining, reset
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SQLStore:
+    """Shared store on a SQL table; one short transaction per hit"""
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self._hits = 0
+        RateLimitBucket.__table__.create(bind=engine, checkfirst=True)
+
+    def _insert_ignore(self, conn, key: str, now: float):
+        table = RateLimitBucket.__table__
+        values = {"key": key, "window_start": 0.0, "current_count": 0, "previous_count": 0, "updated_at": now}
+        dialect = self.engine.dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            conn.execute(insert(table).values(**values).on_conflict_do_nothing(index_elements=["key"]))
+        else:
+            try:
+                with conn.begin_nested():
+                    conn.execute(table.insert().values(**values))
+            except IntegrityError:
+                pass
+
+    def hit(self, key: str, now: float, window: int, limit: int):
+        table = RateLimitBucket.__table__
+        with self.engine.begin() as conn:
+            # Writing first takes SQLite's write lock (and creates the row for
+            # Postgres' FOR UPDATE), so concurrent workers serialize per key.
+            self._insert_ignore(conn, key, now)
+            row = conn.execute(
+                select(table.c.window_start, table.c.current_count, table.c.previous_count)
+                .where(table.c.key == key)
+                .with_for_update()
+            ).one()
+            allowed, (start, current, previous), remaining, reset = evaluate(tuple(row), now, window, limit)
+            conn.execute(
+                update(table).where(table.c.key == key).values(
+                    window_start=start, current_count=current, previous_count=previous, updated_at=now
+                )
+            )
+
+        self._hits += 1
+        if self._hits % self.PURGE_EVERY == 0:
+            self.purge(now - 2 * window)
+        return allowed, remaining, reset
+
+    def purge(self, older_than: float):
+        with self.engine.begin() as conn:
+            conn.execute(delete(RateLimitBucket.__table__).where(RateLimitBucket.updated_at < older_than))
+
+
+class RateLimiter:
+    def __init__(self, limit: int, window: int, store=None):
+        self.limit = limit
+        self.window = window
+        self.store = store if store is not None else MemoryStore()
+
+    def hit(self, key: str, now: Optional[float] = None) -> RateLimitResult:
+        now = time.time() if now is None else now
+        allowed, remaining, reset = self.store.hit(key, now, self.window, self.limit)
+        return RateLimitResult(allowed, self.limit, remaining, reset, self.window)
+
+
+def build_rate_limiter(limit: int, window: int, store_url: str = "memory", max_keys: int = 10000) -> RateLimiter:
+    """store_url: "memory", "database" (the app's DATABASE_URL) or a sqlite:/// file URL"""
+    if store_url == "memory":
+        store = MemoryStore(max_keys=max_keys)
+    elif store_url == "database":
+        from database import engine
+        store = SQLStore(engine)
+    elif store_url.startswith("sqlite"):
+        store = SQLStore(create_engine(store_url, connect_args={"check_same_thread": False, "timeout": 5}))
+    else:
+        raise ValueError(f"Unsupported RATE_LIMIT_STORE: {store_url}")
+    logger.info(f"Rate limit store: {type(store).__name__}")
+    return RateLimiter(limit, window, store)
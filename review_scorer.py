@@ -0,0 +1,86 @@
+"""
+Heuristic scorer for test/spam reviews.
+
+The phrases are the ones admin_cleanup has always searched for, compiled
+once into a single alternation so scoring a review is one regex pass per
+field. Every alternative is a literal phrase, so the matched text maps
+straight back to its category without named groups (which make the
+matcher about three times slower). More specific phrases come first
+because alternation picks the leftmost alternative at each position.
+
+Phrases only match whole words ("test" is not found in "latest"). The
+single test words ("sample", "demo", ...) and the length check are applied
+to the name and text respectively: "a sample of the oak" is a real review,
+and most real names are short.
+"""
+
+import os
+import re
+from typing import NamedTuple
+
+# Reviews scoring at or above this are stored flagged (hidden until approved)
+SPAM_FLAG_THRESHOLD = int(os.getenv("SPAM_FLAG_THRESHOLD", "3"))
+
+# (category, weight, phrases)
+_CATEGORIES = (
+    # Test content
+    ("test_content", 3, ("test review", "sample review", "fake review", "demo review")),
+    # Common test phrases
+    ("test_phrase", 3, ("this is a test", "test message")),
+    # "testing" on its own: genuine reviews mention moisture or load testing,
+    # so it stays below the threshold and needs a second signal to flag
+    ("testing", 2, ("testing",)),
+    # Test names (name field only)
+    ("test_word", 2, ("test", "demo", "sample", "fake", "dummy", "example")),
+    # Generic content
+    ("generic_praise", 1, ("great work", "amazing", "excellent", "wonderful", "fantastic")),
+)
+_WEIGHTS = {name: weight for name, weight, _ in _CATEGORIES}
+_WEIGHTS.update(very_short=1, short_generic=1)
+
+_NAME_ONLY = {"test_word"}
+
+_CATEGORY_BY_PHRASE = {phrase: name for name, _, phrases in _CATEGORIES for phrase in phrases}
+
+
+def _whole_words(phrases) -> re.Pattern:
+    return re.compile(r"\b(?:" + "|".join(re.escape(phrase) for phrase in phrases) + r")\b")
+
+
+_NAME_MATCHER = _whole_words(phrase for _, _, phrases in _CATEGORIES for phrase in phrases)
+_TEXT_MATCHER = _whole_words(phrase for name, _, phrases in _CATEGORIES if name not in _NAME_ONLY for phrase in phrases)
+
+# Very short review text (the old r'^.{1,20}$', checked by length instead of regex)
+_VERY_SHORT = 20
+_SHORT_GENERIC = _whole_words(("good", "great", "nice", "amazing"))
+
+
+class ReviewScore(NamedTuple):
+    score: int
+    reasons: tuple[str, ...]
+
+    @property
+    def flagged(self) -> bool:
+        return self.score >= SPAM_FLAG_THRESHOLD
+
+
+def score_review(name: str, text: str) -> ReviewScore:
+    """Sum of the weights of every category matched in the name or text"""
+    name, text = name.lower(), text.lower()
+    reasons = set()
+    for matcher, field in ((_NAME_MATCHER, name), (_TEXT_MATCHER, text)):
+        for match in matcher.finditer(field):
+            reasons.add(_CATEGORY_BY_PHRASE[match.group()])
+    if 0 < len(text) <= _VERY_SHORT and "\n" not in text:
+        reasons.add("very_short")
+    elif len(text) < 25 and _SHORT_GENERIC.search(text):
+        # Also check for very generic content; brevity only counts once
+        reasons.add("short_generic")
+
+    score = sum(_WEIGHTS[reason] for reason in reasons)
+    return ReviewScore(score, tuple(sorted(reasons)))
+
+
+def is_test_review(name: str, text: str) -> bool:
+    """The cleanup tool's original rule: any heuristic match at all"""
+    return score_review(name, text).score > 0
@@ -0,0 +1,125 @@
+"""
+Incrementally maintained review statistics.
+
+Writers call record_reviews_added / record_reviews_removed after flushing
+their change and before committing, so the summary row moves in the same
+transaction as the reviews themselves. Only published (unflagged) reviews
+are counted. Reads are a single primary-key lookup and never scan the
+reviews table.
+"""
+
+from typing import Iterable, Optional
+from sqlalchemy import false, func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from models import Review, ReviewStats
+
+STATS_ROW_ID = 1
+STAR_COLUMNS = {star: f"stars_{star}" for star in range(1, 6)}
+
+
+def _apply_delta(db: Session, ratings: Iterable[Optional[int]], sign: int):
+    deltas = {"review_count": 0, "rated_count": 0, "rating_sum": 0}
+    for rating in ratings:
+        deltas["review_count"] += 1
+        if rating is None:
+            continue
+        deltas["rated_count"] += 1
+        deltas["rating_sum"] += rating
+        column = STAR_COLUMNS[rating]
+        deltas[column] = deltas.get(column, 0) + 1
+
+    if not deltas["review_count"]:
+        return
+
+    table = ReviewStats.__table__
+    values = {name: table.c[name] + sign * amount for name, amount in deltas.items() if amount}
+    result = db.execute(update(table).where(table.c.id == STATS_ROW_ID).values(**values))
+    if result.rowcount == 0:
+        # No summary row yet; the flushed change is already visible to the
+        # rebuild, so don't apply the delta on top of it.
+        rebuild_stats(db)
+
+
+def record_reviews_added(db: Session, ratings: Iterable[Optional[int]]):
+    """Account for reviews that were just inserted (call after flush)"""
+    _apply_delta(db, ratings, 1)
+
+
+def record_reviews_removed(db: Session, ratings: Iterable[Optional[int]]):
+    """Account for reviews that were just deleted (call after flush)"""
+    _apply_delta(db, ratings, -1)
+
+
+def _upsert_stats(db: Session, values: dict):
+    # Two callers can both find the row missing; whichever writes last wins
+    # instead of the other failing on the primary key
+    table = ReviewStats.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        db.execute(
+            insert(table).values(id=STATS_ROW_ID, **values).on_conflict_do_update(index_elements=["id"], set_=values)
+        )
+        return
+    try:
+        with db.begin_nested():
+            db.execute(table.insert().values(id=STATS_ROW_ID, **values))
+    except IntegrityError:
+        db.execute(update(table).where(table.c.id == STATS_ROW_ID).values(**values))
+
+
+def rebuild_stats(db: Session) -> ReviewStats:
+    """Recompute the summary row from scratch (one grouped scan of reviews)"""
+    values = {"review_count": 0, "rated_count": 0, "rating_sum": 0}
+    values.update({column: 0 for column in STAR_COLUMNS.values()})
+
+    counts = (
+        db.query(Review.rating, func.count())
+        .filter(Review.flagged == false())
+        .group_by(Review.rating)
+        .all()
+    )
+    for rating, count in counts:
+        values["review_count"] += count
+        if rating is None:
+            continue
+        values["rated_count"] += count
+        values["rating_sum"] += rating * count
+        values[STAR_COLUMNS[rating]] += count
+
+    db.flush()
+    _upsert_stats(db, values)
+    return db.get(ReviewStats, STATS_ROW_ID, populate_existing=True)
+
+
+def ensure_stats():
+    """Seed the summary row for an existing reviews table (used by init_db)"""
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        if db.get(ReviewStats, STATS_ROW_ID) is None:
+            rebuild_stats(db)
+            db.commit()
+    finally:
+        db.close()
+
+
+def get_stats(db: Session) -> dict:
+    """Read the summary row, building it once if it doesn't exist yet"""
+    stats = db.get(ReviewStats, STATS_ROW_ID)
+    if stats is None:
+        stats = rebuild_stats(db)
+        db.commit()
+
+    return {
+        "review_count": stats.review_count,
+        "rated_count": stats.rated_count,
+        "unrated_count": stats.review_count - stats.rated_count,
+        "average_rating": round(stats.rating_sum / stats.rated_count, 2) if stats.rated_count else None,
+        "histogram": {str(star): getattr(stats, column) for star, column in STAR_COLUMNS.items()},
+    }
@@ -1,51 +1,55 @@
 import os
 import logging
-from fastapi import APIRouter, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
 from schemas import ContactForm
-from routers.send_email import send_email_with_resend
+from database import get_db
+from routers.send_email import build_owner_email, build_confirmation_email
+import outbox
+from concurrency import concurrency_limit
 
-# Setup logging
-logging.basicConfig(
-    level=logging.DEBUG if os.getenv("ENV") == "development" else logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
 logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/contact",
-    tags=["contact"]
+    tags=["contact"],
+    dependencies=[Depends(concurrency_limit("db"))],
 )
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
-def submit_contact_form(form: ContactForm, request: Request):
-    # Import rate limiting function from main
-    from main import check_rate_limit
-    
-    # Check rate limit before processing
-    check_rate_limit(request)
-    
+def submit_contact_form(form: ContactForm, db: Session = Depends(get_db)):
+    # Content type, body size, honeypot and rate limit were already checked
+    # by contact_guard before the body was parsed
     env = os.getenv("ENV", "development")
 
     try:
         if env == "development":
             logger.debug(f"Received contact form: {form.dict()}")
 
-        # Honeypot spam check
-        if hasattr(form, "company") and form.company:
-            logger.warning("Spam detected: Honeypot field was filled.")
-            raise HTTPException(status_code=400, detail="Spam detected.")
-
         skip_email = os.getenv("SKIP_EMAIL", "false").lower() == "true"
         if not skip_email:
-            send_email_with_resend(form)
-            logger.info("Email successfully sent.")
+            # Queue both emails in one transaction; the outbox worker delivers them
+            if outbox.OWNER_DIGEST_ENABLED:
+                # Owner gets these batched into one email by the outbox worker
+                outbox.enqueue_email(
+                    db, outbox.KIND_DIGEST_ITEM, {"name": form.name, "email": form.email, "message": form.message}
+                )
+            else:
+                outbox.enqueue_email(db, "owner_notification", build_owner_email(form))
+            outbox.enqueue_email(db, "customer_confirmation", build_confirmation_email(form))
+            db.commit()
+            if outbox.outbox_worker:
+                outbox.outbox_worker.wake()
+            logger.info("Emails queued for delivery.")
         else:
             logger.info("Email sending skipped (dev mode).")
 
         return {"message": "Contact form received."}
 
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Email sending failed: {e}", exc_info=(env == "development"))
+        logger.error(f"Contact form processing failed: {e}", exc_info=(env == "development"))
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred while processing your request."
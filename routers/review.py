@@ -1,36 +1,386 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import base64
+import binascii
+import json
+import logging
+import os
+import secrets
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Optional, Union
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import and_, bindparam, false, func, insert, literal, or_, select, String
+from sqlalchemy.exc import OperationalError, ProgrammingError
 from sqlalchemy.orm import Session
 from models import Review
-from schemas import ReviewCreate, ReviewOut
-from database import get_db
+from schemas import ReviewCreate, ReviewImport, ReviewOut, ReviewPage, ReviewSearchPage, ReviewStatsOut
+from database import DB_ASYNC, SessionLocal, get_async_db, get_db, get_read_db, pin_to_primary, sqlite_timestamp
+from cache import CachedResponse, ResponseCache, etag_matches
+from review_stats import get_stats, record_reviews_added, record_reviews_removed
+from search import search_reviews
+from review_scorer import score_review
+from write_coalescer import review_coalescer
+from concurrency import concurrency_limit
+
+if DB_ASYNC or TYPE_CHECKING:
+    # Only needed (and only worth its import time) when the async handlers are registered
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/reviews",
-    tags=["reviews"]
+    tags=["reviews"],
+    dependencies=[Depends(concurrency_limit("db"))],
 )
 
-# GET all reviews
-@router.get("/", response_model=list[ReviewOut])
-def get_reviews(db: Session = Depends(get_db)):
-    return db.query(Review).order_by(Review.created_at.desc()).all()
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+MAX_SEARCH_OFFSET = 1000
+
+# Serialized listing cache; writers below invalidate it after each commit and
+# the TTL is only a safety net for writes made outside this process.
+REVIEWS_CACHE_TTL = float(os.getenv("REVIEWS_CACHE_TTL", "300"))
+review_cache = ResponseCache(ttl=REVIEWS_CACHE_TTL)
+
+# Listing rows are built as plain dicts in ReviewOut field order and dumped
+# straight to JSON, skipping ORM hydration and per-row model validation.
+REVIEW_FIELDS = tuple(ReviewOut.model_fields)
+_json_adapter = TypeAdapter(Any)
+
+# Bulk export/import
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+# Without a token the admin endpoints are open in development and disabled in production
+ADMIN_OPEN_WITHOUT_TOKEN = os.getenv("ENV", "development") != "production"
+EXPORT_BATCH_SIZE = int(os.getenv("REVIEWS_EXPORT_BATCH_SIZE", "1000"))
+IMPORT_CHUNK_SIZE = int(os.getenv("REVIEWS_IMPORT_CHUNK_SIZE", "5000"))
+MAX_ERRORS_PER_CHUNK = 20
+
+
+def encode_cursor(review) -> str:
+    """Build the opaque cursor pointing just past the given review (model or row)"""
+    raw = json.dumps([review.created_at.isoformat(), review.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Unpack a cursor produced by encode_cursor, 400 on anything else"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, review_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(review_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _created_at_bound(dialect_name: str, created_at: datetime):
+    # SQLite keeps server_default timestamps as 'YYYY-MM-DD HH:MM:SS' text and
+    # compares them as strings, so bind the cursor in that same format.
+    if dialect_name == "sqlite":
+        return literal(sqlite_timestamp(created_at), String)
+    return created_at
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Guard for bulk admin endpoints; without ADMIN_TOKEN, open in development and closed in production"""
+    if not ADMIN_TOKEN:
+        if ADMIN_OPEN_WITHOUT_TOKEN:
+            return
+        raise HTTPException(status_code=503, detail="Admin endpoints are disabled: ADMIN_TOKEN is not configured")
+    if not secrets.compare_digest((x_admin_token or "").encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+def _cached_json(entry, if_none_match: Optional[str], cache_status: str) -> Response:
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache", "X-Cache": cache_status}
+    if etag_matches(if_none_match, entry.etag):
+        review_cache.record_not_modified()
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+def parse_fields(fields: Optional[str]) -> tuple[str, ...]:
+    """Validate a comma-separated fields= projection, keeping ReviewOut order"""
+    if not fields:
+        return REVIEW_FIELDS
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(REVIEW_FIELDS)
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}. Allowed: {', '.join(REVIEW_FIELDS)}",
+        )
+    return tuple(name for name in REVIEW_FIELDS if name in requested)
+
+
+def _listing_statement(dialect_name: str, limit: Optional[int], cursor: Optional[str], fields: tuple[str, ...]):
+    """Column SELECT for the full listing (page_limit None) or one keyset page"""
+    # id and created_at are always fetched: they order the rows and build cursors
+    columns = set(fields) | {"id", "created_at"}
+    stmt = (
+        select(*(getattr(Review, name) for name in REVIEW_FIELDS if name in columns))
+        .where(Review.flagged == false())
+        .order_by(Review.created_at.desc(), Review.id.desc())
+    )
+    if limit is None and cursor is None:
+        return stmt, None
+
+    limit = limit or DEFAULT_PAGE_SIZE
+    if cursor:
+        created_at, review_id = decode_cursor(cursor)
+        bound = _created_at_bound(dialect_name, created_at)
+        stmt = stmt.where(or_(
+            Review.created_at < bound,
+            and_(Review.created_at == bound, Review.id < review_id),
+        ))
+
+    # Fetch one extra row to know whether another page exists
+    return stmt.limit(limit + 1), limit
+
+
+def _render_listing(rows, page_limit: Optional[int], fields: tuple[str, ...]) -> bytes:
+    if page_limit is not None:
+        next_cursor = encode_cursor(rows[page_limit - 1]) if len(rows) > page_limit else None
+        rows = rows[:page_limit]
+
+    positions = [rows[0]._fields.index(name) for name in fields] if rows else []
+    items = [{name: row[i] for name, i in zip(fields, positions)} for row in rows]
+    if page_limit is None:
+        return _json_adapter.dump_json(items)
+    return _json_adapter.dump_json({"items": items, "next_cursor": next_cursor})
+
+
+# GET all reviews (or one keyset page when limit/cursor is given)
+def get_reviews(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; enables paginated mode"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of review fields to return"),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_read_db),
+):
+    fields = parse_fields(fields)
+    key = (limit, cursor, fields)
+    # A client just pinned to the primary after its own write skips the shared
+    # cache, which may have been refilled from a replica that hasn't caught up
+    pinned = db.info.get("pinned", False)
+    entry = None if pinned else review_cache.get(key)
+    if entry is not None:
+        return _cached_json(entry, if_none_match, "HIT")
+
+    generation = review_cache.generation
+    stmt, page_limit = _listing_statement(db.get_bind().dialect.name, limit, cursor, fields)
+    rows = db.execute(stmt).all()
+    body = _render_listing(rows, page_limit, fields)
+    if pinned:
+        return _cached_json(CachedResponse(body, ResponseCache.make_etag(body), 0.0), if_none_match, "BYPASS")
+    entry = review_cache.put(key, body, generation)
+    return _cached_json(entry, if_none_match, "MISS")
+
+# Keyword search over name/text, ranked by relevance
+@router.get("/search", response_model=ReviewSearchPage)
+def search(
+    q: str = Query(..., min_length=1, max_length=200, description="Keywords, e.g. kitchen deck"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0, le=MAX_SEARCH_OFFSET),
+    db: Session = Depends(get_read_db),
+):
+    try:
+        # One extra row tells us whether there is a next page
+        rows = search_reviews(db, q, limit + 1, offset)
+    except (OperationalError, ProgrammingError) as e:
+        raise HTTPException(status_code=503, detail=f"Search index unavailable; run init_db ({e.orig})")
+
+    items = [dict(zip(REVIEW_FIELDS, (row.name, row.text, row.rating, row.id, row.created_at))) for row in rows[:limit]]
+    return {"items": items, "next_offset": offset + limit if len(rows) > limit else None}
+
+# Star average, histogram and count, read from the incrementally kept summary
+@router.get("/stats", response_model=ReviewStatsOut)
+def get_review_stats(db: Session = Depends(get_db)):
+    return get_stats(db)
+
+# Cache counters, to confirm the listing cache is doing its job
+@router.get("/cache-stats")
+def get_review_cache_stats():
+    return review_cache.stats()
+
+# Stream every review as NDJSON (admin backup/migration)
+@router.get("/export", dependencies=[Depends(require_admin)])
+def export_reviews():
+    return StreamingResponse(
+        _export_lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="reviews.ndjson"'},
+    )
+
+
+def _export_lines():
+    # Own session: the response body is produced after the request's
+    # dependencies have already been torn down.
+    db = SessionLocal()
+    try:
+        stmt = select(*(getattr(Review, name) for name in REVIEW_FIELDS)).order_by(Review.id)
+        # yield_per streams from a server-side cursor where the driver supports it
+        result = db.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for rows in result.partitions():
+            yield b"".join(_json_adapter.dump_json(dict(zip(REVIEW_FIELDS, row))) + b"\n" for row in rows)
+    finally:
+        db.close()
+
+
+def _import_statement(dialect_name: str):
+    # A Core insert lets SQLAlchemy batch the executemany into multi-row
+    # VALUES ("insertmanyvalues"); created_at falls back to the server clock.
+    created_at_type = String if dialect_name == "sqlite" else Review.created_at.type
+    return insert(Review.__table__).values(
+        name=bindparam("name"),
+        text=bindparam("text"),
+        rating=bindparam("rating"),
+        spam_score=bindparam("spam_score"),
+        flagged=bindparam("flagged"),
+        created_at=func.coalesce(bindparam("created_at", type_=created_at_type), func.current_timestamp()),
+    )
+
+
+def _insert_chunk(rows: list[dict]) -> Optional[str]:
+    """Insert one validated chunk in a single executemany transaction; returns an error or None"""
+    db = SessionLocal()
+    try:
+        dialect_name = db.get_bind().dialect.name
+        if dialect_name == "sqlite":
+            for row in rows:
+                if row["created_at"] is not None:
+                    row["created_at"] = sqlite_timestamp(row["created_at"])
+        db.execute(_import_statement(dialect_name), rows)
+        record_reviews_added(db, [row["rating"] for row in rows if not row["flagged"]])
+        db.commit()
+        return None
+    except Exception as e:
+        db.rollback()
+        return str(e)
+    finally:
+        db.close()
+
+
+# Bulk-load reviews from an NDJSON body (one ReviewCreate object per line)
+@router.post("/import", dependencies=[Depends(require_admin)])
+async def import_reviews(request: Request):
+    report = {"inserted": 0, "failed": 0, "chunks": []}
+    state = {"rows": [], "errors": [], "invalid": 0, "first_line": 1}
+
+    async def flush(last_line: int):
+        rows = state["rows"]
+        chunk = {"chunk": len(report["chunks"]) + 1, "lines": [state["first_line"], last_line], "inserted": 0}
+        if rows:
+            error = await run_in_threadpool(_insert_chunk, rows)
+            if error is None:
+                chunk["inserted"] = len(rows)
+            else:
+                chunk["error"] = error
+                state["invalid"] += len(rows)
+        chunk["failed"] = state["invalid"]
+        if state["errors"]:
+            chunk["errors"] = state["errors"]
+        report["inserted"] += chunk["inserted"]
+        report["failed"] += chunk["failed"]
+        report["chunks"].append(chunk)
+        state.update(rows=[], errors=[], invalid=0, first_line=last_line + 1)
+
+    def parse(line: bytes, line_no: int):
+        if not line.strip():
+            return
+        try:
+            review = ReviewImport.model_validate_json(line)
+            row = review.model_dump()
+            score = score_review(review.name, review.text)
+            row.update(spam_score=score.score, flagged=score.flagged)
+            state["rows"].append(row)
+        except ValidationError as e:
+            state["invalid"] += 1
+            if len(state["errors"]) < MAX_ERRORS_PER_CHUNK:
+                state["errors"].append({"line": line_no, "error": e.errors(include_url=False, include_input=False)})
+
+    def parse_lines(lines: list[bytes], first_line_no: int) -> int:
+        """Parse until a chunk fills up; returns how many lines were consumed"""
+        for i, line in enumerate(lines):
+            parse(line, first_line_no + i)
+            if len(state["rows"]) >= IMPORT_CHUNK_SIZE:
+                return i + 1
+        return len(lines)
+
+    # Validation and scoring are CPU work, so they run on the threadpool one
+    # received block at a time, keeping the event loop free for other requests
+    line_no = 0
+    buffer = b""
+    async for data in request.stream():
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        while lines:
+            consumed = await run_in_threadpool(parse_lines, lines, line_no + 1)
+            line_no += consumed
+            lines = lines[consumed:]
+            if len(state["rows"]) >= IMPORT_CHUNK_SIZE:
+                await flush(line_no)
+    if buffer:
+        line_no += 1
+        await run_in_threadpool(parse, buffer, line_no)
+    if state["rows"] or state["invalid"]:
+        await flush(line_no)
+
+    if report["inserted"]:
+        review_cache.invalidate()
+    return report
+
+def _scored_values(review: ReviewCreate) -> dict:
+    score = score_review(review.name, review.text)
+    if score.flagged:
+        logger.info(
+            "Review flagged for moderation", extra={"spam_score": score.score, "reasons": list(score.reasons)}
+        )
+    return {**review.dict(), "spam_score": score.score, "flagged": score.flagged}
+
+def _scored_review(review: ReviewCreate) -> Review:
+    return Review(**_scored_values(review))
 
 # POST a new review
-@router.post("/", response_model=ReviewOut)
-def create_review(review: ReviewCreate, db: Session = Depends(get_db)):
-    print("Received review:", review)
+def create_review(review: ReviewCreate, response: Response, db: Session = Depends(get_db)):
+    logger.debug("Received review", extra={"reviewer": review.name, "rating": review.rating})
+    if review_coalescer is not None:
+        return _create_review_coalesced(review, response)
     try:
-        new_review = Review(**review.dict())
+        new_review = _scored_review(review)
         db.add(new_review)
+        db.flush()
+        if not new_review.flagged:
+            record_reviews_added(db, [new_review.rating])
         db.commit()
+        review_cache.invalidate()
+        pin_to_primary(response)
         db.refresh(new_review)
         return new_review
     except Exception as e:
-        print("Error creating review:", e)
+        logger.error(f"Error creating review: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _create_review_coalesced(review: ReviewCreate, response: Response) -> dict:
+    # The insert is committed by the shared writer thread together with
+    # whatever other reviews arrived in the same few milliseconds
+    try:
+        created = review_coalescer.submit(_scored_values(review))
+    except TimeoutError:
+        # Withdrawn before it was written, so a retry can't duplicate it
+        logger.error("Review write timed out in the coalescer queue")
+        raise HTTPException(status_code=503, detail="Review not saved; please try again", headers={"Retry-After": "1"})
+    except Exception as e:
+        logger.error(f"Error creating review: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    review_cache.invalidate()
+    pin_to_primary(response)
+    return created
 
 # DELETE a review by ID
-@router.delete("/{review_id}")
-def delete_review(review_id: int, db: Session = Depends(get_db)):
+def delete_review(review_id: int, response: Response, db: Session = Depends(get_db)):
     """Delete a review by ID (admin use)"""
     review = db.query(Review).filter(Review.id == review_id).first()
     if not review:
@@ -38,9 +388,107 @@ def delete_review(review_id: int, db: Session = Depends(get_db)):
     
     try:
         db.delete(review)
+        db.flush()
+        if not review.flagged:
+            record_reviews_removed(db, [review.rating])
         db.commit()
+        review_cache.invalidate()
+        pin_to_primary(response)
         return {"message": f"Review {review_id} deleted successfully"}
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to delete review: {str(e)}")
-    
\ No newline at end of file
+
+
+# Publish a review the spam scorer held back
+@router.post("/{review_id}/approve", response_model=ReviewOut, dependencies=[Depends(require_admin)])
+def approve_review(review_id: int, db: Session = Depends(get_db)):
+    review = db.get(Review, review_id)
+    if not review:
+        raise HTTPException(status_code=404, detail="Review not found")
+    if review.flagged:
+        review.flagged = False
+        db.flush()
+        record_reviews_added(db, [review.rating])
+        db.commit()
+        review_cache.invalidate()
+        db.refresh(review)
+    return review
+
+
+# Async variants of the handlers above, used when DB_ASYNC=true so waiting on
+# the database doesn't hold one of Starlette's threadpool tokens.
+
+async def get_reviews_async(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; enables paginated mode"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of review fields to return"),
+    if_none_match: Optional[str] = Header(None),
+    db: "AsyncSession" = Depends(get_async_db),
+):
+    fields = parse_fields(fields)
+    key = (limit, cursor, fields)
+    entry = review_cache.get(key)
+    if entry is not None:
+        return _cached_json(entry, if_none_match, "HIT")
+
+    generation = review_cache.generation
+    stmt, page_limit = _listing_statement(db.bind.dialect.name, limit, cursor, fields)
+    rows = (await db.execute(stmt)).all()
+    entry = review_cache.put(key, _render_listing(rows, page_limit, fields), generation)
+    return _cached_json(entry, if_none_match, "MISS")
+
+
+async def create_review_async(review: ReviewCreate, db: "AsyncSession" = Depends(get_async_db)):
+    logger.debug("Received review", extra={"reviewer": review.name, "rating": review.rating})
+    if review_coalescer is not None:
+        try:
+            created = await asyncio.wrap_future(review_coalescer.enqueue(_scored_values(review)))
+        except Exception as e:
+            logger.error(f"Error creating review: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+        review_cache.invalidate()
+        return created
+    try:
+        new_review = _scored_review(review)
+        db.add(new_review)
+        await db.flush()
+        if not new_review.flagged:
+            await db.run_sync(record_reviews_added, [new_review.rating])
+        await db.commit()
+        review_cache.invalidate()
+        await db.refresh(new_review)
+        return new_review
+    except Exception as e:
+        logger.error(f"Error creating review: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def delete_review_async(review_id: int, db: "AsyncSession" = Depends(get_async_db)):
+    """Delete a review by ID (admin use)"""
+    review = (await db.execute(select(Review).where(Review.id == review_id))).scalar_one_or_none()
+    if not review:
+        raise HTTPException(status_code=404, detail="Review not found")
+
+    try:
+        await db.delete(review)
+        await db.flush()
+        if not review.flagged:
+            await db.run_sync(record_reviews_removed, [review.rating])
+        await db.commit()
+        review_cache.invalidate()
+        return {"message": f"Review {review_id} deleted successfully"}
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to delete review: {str(e)}")
+
+
+# Register list/create/delete with the sync or async implementation (DB_ASYNC)
+if DB_ASYNC:
+    _list_handler, _create_handler, _delete_handler = get_reviews_async, create_review_async, delete_review_async
+else:
+    _list_handler, _create_handler, _delete_handler = get_reviews, create_review, delete_review
+
+router.add_api_route("/", _list_handler, methods=["GET"], response_model=Union[list[ReviewOut], ReviewPage])
+router.add_api_route("/", _create_handler, methods=["POST"], response_model=ReviewOut)
+router.add_api_route("/{review_id}", _delete_handler, methods=["DELETE"])
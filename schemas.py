@@ -1,8 +1,11 @@
 from typing import Optional
 from datetime import datetime
-from pydantic import BaseModel, EmailStr, Field, validator
+from pydantic import BaseModel, EmailStr, Field, field_validator
 import re
 
+_WHITESPACE = re.compile(r'\s+')
+_NAME_CHARACTERS = re.compile(r'^[a-zA-Z\s\-\'\.]+$')
+
 class ReviewBase(BaseModel):
     name: str = Field(..., min_length=1, max_length=100, description="Customer name")
     text: str = Field(..., min_length=10, max_length=1000, description="Review text")
@@ -11,6 +14,9 @@ class ReviewBase(BaseModel):
 class ReviewCreate(ReviewBase):
     pass 
 
+class ReviewImport(ReviewCreate):
+    created_at: Optional[datetime] = Field(None, description="Original timestamp; defaults to now")
+
 class ReviewOut(ReviewBase):
     id: int
     created_at: datetime
@@ -18,24 +24,41 @@ class ReviewOut(ReviewBase):
     class Config:
         from_attributes = True
 
+class ReviewPage(BaseModel):
+    items: list[ReviewOut]
+    next_cursor: Optional[str] = Field(None, description="Opaque cursor for the next page, null on the last page")
+
+class ReviewSearchPage(BaseModel):
+    items: list[ReviewOut]
+    next_offset: Optional[int] = Field(None, description="Offset of the next page, null on the last page")
+
+class ReviewStatsOut(BaseModel):
+    review_count: int
+    rated_count: int
+    unrated_count: int
+    average_rating: Optional[float] = Field(None, description="Mean of rated reviews, null when none are rated")
+    histogram: dict[str, int] = Field(..., description="Review count per star rating 1-5")
+
 class ContactForm(BaseModel):
     name: str = Field(..., min_length=1, max_length=100, description="Contact name")
     email: EmailStr = Field(..., description="Valid email address")
     message: str = Field(..., min_length=10, max_length=2000, description="Message content")
     company: Optional[str] = Field("", max_length=0, description="Honeypot field (hidden)")  # Honeypot field (hidden in frontend)
     
-    @validator('name')
+    @field_validator('name')
+    @classmethod
     def validate_name(cls, v):
         # Remove extra whitespace and check for valid characters
-        cleaned = re.sub(r'\s+', ' ', v.strip())
-        if not re.match(r'^[a-zA-Z\s\-\'\.]+$', cleaned):
+        cleaned = _WHITESPACE.sub(' ', v.strip())
+        if not _NAME_CHARACTERS.match(cleaned):
             raise ValueError('Name contains invalid characters')
         return cleaned
     
-    @validator('message')
+    @field_validator('message')
+    @classmethod
     def validate_message(cls, v):
         # Remove excessive whitespace and check for reasonable content
-        cleaned = re.sub(r'\s+', ' ', v.strip())
+        cleaned = _WHITESPACE.sub(' ', v.strip())
         if len(cleaned) < 10:
             raise ValueError('Message must be at least 10 characters long')
         if len(cleaned) > 2000:
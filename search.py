@@ -0,0 +1,97 @@
+"""
+Full-text search over review names and text.
+
+SQLite: an external-content FTS5 table (reviews_fts) kept in sync by
+triggers on reviews, ranked with bm25.
+PostgreSQL: a stored tsvector column generated from name/text with a GIN
+index, ranked with ts_rank.
+Other dialects fall back to a LIKE scan.
+"""
+
+import re
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from models import Review
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+_SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS reviews_fts USING fts5(
+        name, text, content='reviews', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS reviews_fts_ai AFTER INSERT ON reviews BEGIN
+        INSERT INTO reviews_fts(rowid, name, text) VALUES (new.id, new.name, new.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS reviews_fts_ad AFTER DELETE ON reviews BEGIN
+        INSERT INTO reviews_fts(reviews_fts, rowid, name, text) VALUES ('delete', old.id, old.name, old.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS reviews_fts_au AFTER UPDATE OF name, text ON reviews BEGIN
+        INSERT INTO reviews_fts(reviews_fts, rowid, name, text) VALUES ('delete', old.id, old.name, old.text);
+        INSERT INTO reviews_fts(rowid, name, text) VALUES (new.id, new.name, new.text);
+    END""",
+]
+
+_POSTGRES_DDL = [
+    """ALTER TABLE reviews ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('english', coalesce(name, '') || ' ' || coalesce(text, ''))) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_reviews_search_vector ON reviews USING GIN (search_vector)",
+]
+
+_RESULT_COLUMNS = (Review.id, Review.name, Review.text, Review.rating, Review.created_at)
+
+
+def install_search_index(engine: Engine):
+    """Create the search index for the engine's dialect (idempotent)"""
+    dialect = engine.dialect.name
+    with engine.begin() as conn:
+        if dialect == "sqlite":
+            existed = inspect(conn).has_table("reviews_fts")
+            for statement in _SQLITE_DDL:
+                conn.execute(text(statement))
+            if not existed:
+                # Index rows that were there before the triggers existed
+                conn.execute(text("INSERT INTO reviews_fts(reviews_fts) VALUES ('rebuild')"))
+        elif dialect == "postgresql":
+            for statement in _POSTGRES_DDL:
+                conn.execute(text(statement))
+
+
+def fts5_query(q: str) -> str:
+    """Turn free text into an FTS5 query: every word must match, as a quoted token"""
+    return " ".join(f'"{token}"' for token in _TOKEN.findall(q))
+
+
+def search_reviews(db: Session, q: str, limit: int, offset: int):
+    """Ranked published matches for q; returns rows of (id, name, text, rating, created_at)"""
+    dialect = db.get_bind().dialect.name
+    params = {"limit": limit, "offset": offset}
+
+    if dialect == "sqlite":
+        params["q"] = fts5_query(q)
+        if not params["q"]:
+            return []
+        stmt = text(
+            "SELECT r.id, r.name, r.text, r.rating, r.created_at "
+            "FROM reviews_fts JOIN reviews r ON r.id = reviews_fts.rowid "
+            "WHERE reviews_fts MATCH :q AND NOT r.flagged "
+            "ORDER BY reviews_fts.rank, r.id DESC LIMIT :limit OFFSET :offset"
+        )
+    elif dialect == "postgresql":
+        params["q"] = q
+        stmt = text(
+            "SELECT r.id, r.name, r.text, r.rating, r.created_at "
+            "FROM reviews r, websearch_to_tsquery('english', :q) query "
+            "WHERE r.search_vector @@ query AND NOT r.flagged "
+            "ORDER BY ts_rank(r.search_vector, query) DESC, r.id DESC LIMIT :limit OFFSET :offset"
+        )
+    else:
+        params["q"] = f"%{q}%"
+        stmt = text(
+            "SELECT r.id, r.name, r.text, r.rating, r.created_at FROM reviews r "
+            "WHERE (r.name LIKE :q OR r.text LIKE :q) AND NOT r.flagged "
+            "ORDER BY r.created_at DESC, r.id DESC LIMIT :limit OFFSET :offset"
+        )
+
+    # Typed columns so created_at comes back as a datetime on every dialect
+    return db.execute(stmt.columns(*_RESULT_COLUMNS), params).all()
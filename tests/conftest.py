@@ -0,0 +1,37 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Settings are read at import time, so they must be in place before any app module loads
+_tmp = tempfile.mkdtemp(prefix="oldweiler-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(_tmp, 'test.db')}",
+    "RESEND_API_KEY": "re_test",
+    "SKIP_EMAIL": "true",
+    "ENV": "development",
+    "LOG_FILE": "",
+    "OUTBOX_WORKER_ENABLED": "false",
+    "STARTUP_WARMUP_ENABLED": "false",
+    "RATE_LIMIT_REQUESTS": "1000000",
+})
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    from database import engine
+    from init_db import init_db
+    init_db()
+    yield engine
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+    import main
+    with TestClient(main.app) as client:
+        yield client
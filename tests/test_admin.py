@@ -0,0 +1,35 @@
+import json
+import pytest
+from routers import review
+
+
+@pytest.fixture
+def production(monkeypatch):
+    monkeypatch.setattr(review, "ADMIN_OPEN_WITHOUT_TOKEN", False)
+    monkeypatch.setattr(review, "ADMIN_TOKEN", None)
+
+
+def test_admin_endpoints_closed_in_production_without_token(client, production):
+    assert client.get("/reviews/export").status_code == 503
+    assert client.post("/reviews/import", content=b"").status_code == 503
+    assert client.post("/reviews/1/approve").status_code == 503
+
+
+def test_admin_token_checked_when_configured(client, monkeypatch):
+    monkeypatch.setattr(review, "ADMIN_TOKEN", "s3cret")
+    assert client.get("/reviews/export").status_code == 403
+    assert client.get("/reviews/export", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.get("/reviews/export", headers={"X-Admin-Token": "s3cret"}).status_code == 200
+
+
+def test_import_reports_lines_across_chunks(client, monkeypatch):
+    monkeypatch.setattr(review, "ADMIN_TOKEN", "s3cret")
+    monkeypatch.setattr(review, "IMPORT_CHUNK_SIZE", 2)
+    good = {"name": "Imported Person", "text": "Imported from the old site", "rating": 5}
+    lines = [json.dumps(good), json.dumps(good), "{not json", json.dumps(good), json.dumps({"name": "x"})]
+    response = client.post("/reviews/import", content="\n".join(lines).encode(), headers={"X-Admin-Token": "s3cret"})
+
+    report = response.json()
+    assert report["inserted"] == 3
+    assert report["failed"] == 2
+    assert [chunk["lines"] for chunk in report["chunks"]] == [[1, 2], [3, 5]]
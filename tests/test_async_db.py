@@ -0,0 +1,53 @@
+"""
+The DB_ASYNC=true handlers. The setting is read at import time, so
+test_async_handlers_in_subprocess re-runs this module in a fresh
+interpreter with it turned on; the other tests only run there.
+"""
+
+import os
+import subprocess
+import sys
+import pytest
+import database
+
+async_only = pytest.mark.skipif(not database.DB_ASYNC, reason="runs in the DB_ASYNC=true subprocess")
+
+
+@pytest.mark.skipif(database.DB_ASYNC, reason="already in the DB_ASYNC=true subprocess")
+def test_async_handlers_in_subprocess():
+    result = subprocess.run(
+        [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider", __file__],
+        env={**os.environ, "DB_ASYNC": "true"},
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "1 skipped" in result.stdout  # only the driver; every async test ran
+
+
+@async_only
+def test_async_handlers_are_registered(client):
+    from routers import review
+    endpoints = {route.endpoint for route in review.router.routes}
+    assert {review.get_reviews_async, review.create_review_async, review.delete_review_async} <= endpoints
+    assert database.get_async_engine().dialect.driver == "aiosqlite"
+
+
+@async_only
+def test_async_list_create_and_delete(client):
+    created = client.post("/reviews/", json={"name": "Async Writer", "text": "Written through aiosqlite", "rating": 4})
+    assert created.status_code == 200
+    review_id = created.json()["id"]
+    assert created.json()["created_at"]
+
+    page = client.get("/reviews/", params={"limit": 5})
+    assert page.headers["x-cache"] == "MISS"
+    assert review_id in [item["id"] for item in page.json()["items"]]
+    assert client.get("/reviews/", params={"limit": 5}).headers["x-cache"] == "HIT"
+    assert client.get("/reviews/stats").json()["histogram"]["4"] >= 1
+
+    assert client.delete(f"/reviews/{review_id}").status_code == 200
+    assert client.delete(f"/reviews/{review_id}").status_code == 404
+    assert review_id not in [item["id"] for item in client.get("/reviews/").json()]
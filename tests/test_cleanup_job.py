@@ -0,0 +1,67 @@
+import os
+import tempfile
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+import cleanup_job
+from database import Base
+from models import Review
+from review_stats import get_stats, rebuild_stats
+
+GENUINE = [("Mary Johnson", "The built-ins in our den are perfect, thank you!", 5),
+           ("Tom Baker", "Kitchen remodel came out better than we imagined.", 4)]
+SPAM = [("Test User", "This is a test review", 1), ("demo", "sample review for the demo", None)]
+
+
+@pytest.fixture
+def db_factory(monkeypatch):
+    # A database of its own, so the job sees exactly these rows
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'cleanup.db')}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(cleanup_job, "engine", engine)
+    monkeypatch.setattr(cleanup_job, "SessionLocal", factory)
+
+    with factory() as db:
+        # Interleaved so every chunk holds both kinds
+        for (name, text, rating), spam in zip(GENUINE, SPAM):
+            db.add(Review(name=name, text=text, rating=rating))
+            db.add(Review(name=spam[0], text=spam[1], rating=spam[2]))
+        db.flush()
+        rebuild_stats(db)
+        db.commit()
+    yield factory
+    engine.dispose()
+
+
+def test_chunks_cover_every_row_once_in_id_order(db_factory):
+    chunks = list(cleanup_job.iter_review_chunks(chunk_size=3))
+    assert [len(chunk) for chunk in chunks] == [3, 1]
+    ids = [row["id"] for chunk in chunks for row in chunk]
+    assert ids == sorted(ids) and len(set(ids)) == 4
+
+    assert [len(chunk) for chunk in cleanup_job.iter_review_chunks(chunk_size=3, max_rows=2)] == [2]
+
+
+def test_deleting_requires_min_score(db_factory):
+    with pytest.raises(SystemExit):
+        cleanup_job.main([])
+    with pytest.raises(ValueError):
+        cleanup_job.run(verbose=False)
+
+    cleanup_job.main(["--dry-run", "--quiet"])
+    with db_factory() as db:
+        assert len(db.scalars(select(Review.id)).all()) == 4
+
+
+def test_batched_deletes_keep_stats_consistent(db_factory):
+    summary = cleanup_job.run(min_score=3, chunk_size=3, workers=1, verbose=False)
+    assert (summary["scanned"], summary["matched"], summary["deleted"]) == (4, 2, 2)
+
+    with db_factory() as db:
+        assert sorted(db.scalars(select(Review.name)).all()) == ["Mary Johnson", "Tom Baker"]
+        kept = get_stats(db)
+        rebuild_stats(db)
+        assert get_stats(db) == kept
+    assert kept["review_count"] == 2
+    assert kept["histogram"] == {"1": 0, "2": 0, "3": 0, "4": 1, "5": 1}
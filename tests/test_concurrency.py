@@ -0,0 +1,67 @@
+import asyncio
+import pytest
+from concurrency import ConcurrencyPool, Overloaded
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_cancel_after_handoff_releases_slot():
+    async def scenario():
+        pool = ConcurrencyPool("test", limit=1, max_queue=4, max_wait_ms=5000)
+        await pool.acquire()
+        waiter = asyncio.create_task(pool.acquire())
+        await asyncio.sleep(0)
+        assert pool.queued == 1
+
+        # Hand the slot over, then cancel the waiter before it gets to run
+        pool.release(0.01)
+        waiter.cancel()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            pass
+        else:
+            # Python < 3.12's wait_for can swallow the cancel and return the slot
+            pool.release(0.01)
+        return pool
+
+    pool = run(scenario())
+    assert pool.in_use == 0
+    assert pool.queued == 0
+
+
+def test_cancel_while_queued_keeps_holder():
+    async def scenario():
+        pool = ConcurrencyPool("test", limit=1, max_queue=4, max_wait_ms=5000)
+        await pool.acquire()
+        waiter = asyncio.create_task(pool.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert pool.in_use == 1
+        pool.release(0.01)
+        return pool
+
+    assert run(scenario()).in_use == 0
+
+
+def test_sheds_when_queue_full_or_wait_too_long():
+    async def scenario():
+        pool = ConcurrencyPool("test", limit=1, max_queue=1, max_wait_ms=50)
+        await pool.acquire()
+        queued = asyncio.create_task(pool.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as full:
+            await pool.acquire()
+        with pytest.raises(Overloaded) as timeout:
+            await queued
+        pool.release(0.01)
+        return pool, full.value, timeout.value
+
+    pool, full, timeout = run(scenario())
+    assert (full.reason, timeout.reason) == ("queue_full", "queue_timeout")
+    assert full.retry_after >= 1
+    assert pool.in_use == 0
@@ -0,0 +1,95 @@
+import pytest
+import main
+from contact_guard import _HONEYPOT_FILLED, ContactGuardMiddleware, GuardContext, RateLimitStage, build_stages
+from rate_limit import RateLimiter
+
+FORM = {"name": "Ada Lovelace", "email": "ada@example.com", "message": "Could you quote for a walnut desk?"}
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    # A fresh, small budget in place of the app's effectively unlimited one
+    limiter = RateLimiter(2, 60)
+    for stage in main.contact_guard_stages:
+        if isinstance(stage, RateLimitStage):
+            monkeypatch.setattr(stage, "limiter", limiter)
+    return limiter
+
+
+@pytest.mark.parametrize("body, filled", [
+    (b'{"company": "Acme"}', True),
+    (b'{"name": "x", "company":"Acme"}', True),
+    (b'{"company" :\n "a"}', True),
+    (b'{"company": ""}', False),
+    (b'{"company": null}', False),
+    (b'{"message": "our company: \\"Acme\\""}', False),
+    (b'{"name": "x"}', False),
+])
+def test_honeypot_pattern(body, filled):
+    assert bool(_HONEYPOT_FILLED.search(body)) is filled
+
+
+def test_stages_run_in_configured_order(limiter):
+    scope = {"type": "http", "headers": [(b"content-type", b"text/plain")], "client": ("10.0.0.1", 1)}
+    ctx = GuardContext(scope)
+    ctx.body = b'{"company": "Acme"}'
+
+    # Default order: the content type fails first and nothing is counted against the client
+    stages = build_stages(["content_type", "body_size", "honeypot", "rate_limit"], 1024, limiter)
+    assert next(r for r in (stage.check(ctx) for stage in stages) if r).status == 415
+    assert len(limiter.store) == 0
+
+    stages = build_stages(["rate_limit", "honeypot", "content_type"], 1024, limiter)
+    assert [stage.name for stage in stages] == ["rate_limit", "honeypot", "content_type"]
+    assert next(r for r in (stage.check(ctx) for stage in stages) if r).status == 400
+    assert len(limiter.store) == 1
+
+    with pytest.raises(ValueError):
+        build_stages(["content_type", "captcha"], 1024, limiter)
+
+
+def test_guard_rejections(client, limiter):
+    assert client.post("/contact/", content=b"name=x", headers={"Content-Type": "application/x-www-form-urlencoded"}).status_code == 415
+    assert client.post("/contact/", json={**FORM, "message": "x" * main.CONTACT_MAX_BODY_BYTES}).status_code == 413
+    assert client.post("/contact/", json={**FORM, "company": "Acme"}).status_code == 400
+    # None of those reached the rate limiter
+    assert len(limiter.store) == 0
+
+
+def test_streamed_body_without_content_length_is_capped(client, limiter):
+    def chunks():
+        for _ in range(main.CONTACT_MAX_BODY_BYTES // 1024 + 2):
+            yield b" " * 1024
+
+    response = client.post("/contact/", content=chunks(), headers={"Content-Type": "application/json"})
+    assert "content-length" not in response.request.headers
+    assert response.status_code == 413
+
+
+def test_rate_limit_headers_reach_the_response(client, limiter):
+    first = client.post("/contact/", json=FORM)
+    assert first.status_code == 201
+    assert first.headers["ratelimit-limit"] == "2"
+    assert first.headers["ratelimit-remaining"] == "1"
+
+    assert client.post("/contact/", json=FORM).status_code == 201
+    rejected = client.post("/contact/", json=FORM)
+    assert rejected.status_code == 429
+    assert int(rejected.headers["retry-after"]) >= 1
+    assert rejected.headers["ratelimit-remaining"] == "0"
+
+
+def test_rejections_never_reach_the_idempotency_store(client, limiter):
+    stored = len(main.idempotency_store)
+    for i in range(3):
+        honeypot = client.post("/contact/", json={**FORM, "company": "Acme"}, headers={"Idempotency-Key": f"bot-{i}"})
+        assert honeypot.status_code == 400
+        too_large = client.post("/contact/", content=b"x" * (5 * 1024 * 1024),
+                                headers={"Content-Type": "application/json", "Idempotency-Key": f"big-{i}"})
+        assert too_large.status_code == 413
+    assert len(main.idempotency_store) == stored
+
+
+def test_guard_is_outside_the_idempotency_middleware():
+    layers = [middleware.cls for middleware in main.app.user_middleware]
+    assert layers.index(ContactGuardMiddleware) < layers.index(main.IdempotencyMiddleware)
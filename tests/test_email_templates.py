@@ -0,0 +1,35 @@
+from email_templates import EmailTemplates
+
+SCRIPT = '<script>alert("x")</script>'
+
+
+def test_owner_email_escapes_submitted_fields():
+    html, text = EmailTemplates("Oldweiler", "Bennington").owner('<b>Eve</b>', 'eve@example.com"><img', SCRIPT)
+    assert "<script>" not in html and "<b>Eve" not in html and '"><img' not in html
+    assert "&lt;script&gt;alert(&quot;x&quot;)&lt;/script&gt;" in html
+    # The plain-text part is not HTML and keeps the message as written
+    assert SCRIPT in text
+
+
+def test_confirmation_escapes_submitted_fields_and_company_details():
+    templates = EmailTemplates("Tom & Sons <Carpentry>", "Bennington")
+    html, text = templates.confirmation("<i>Eve</i>", SCRIPT)
+    assert "<script>" not in html and "<i>Eve" not in html
+    assert "Tom &amp; Sons &lt;Carpentry&gt;" in html
+    assert "Thanks for reaching out, &lt;i&gt;Eve&lt;/i&gt;!" in html
+    assert "Tom & Sons <Carpentry>" in text
+
+
+def test_digest_escapes_every_item():
+    html, text = EmailTemplates("Oldweiler", "Bennington").digest([
+        {"name": "Ann", "email": "ann@example.com", "message": "Plain message"},
+        {"name": "<b>Eve</b>", "email": 'x@example.com"onmouseover="alert(1)', "message": SCRIPT},
+    ])
+    assert "<script>" not in html and '"onmouseover' not in html and "<b>Eve" not in html
+    assert html.count('<div style="border-bottom') == 2
+    assert "Plain message" in html and SCRIPT in text
+
+
+def test_dollar_signs_in_messages_are_not_template_fields():
+    html, text = EmailTemplates("Oldweiler", "Bennington").owner("Ann", "ann@example.com", "Budget $name ${email} $$")
+    assert "Budget $name ${email} $$" in html and "Budget $name ${email} $$" in text
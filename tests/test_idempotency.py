@@ -0,0 +1,204 @@
+import asyncio
+import os
+import tempfile
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from idempotency import IdempotencyMiddleware, MemoryStore, SQLStore
+
+
+@pytest.fixture
+def app():
+    app = FastAPI()
+    app.state.calls = 0
+    app.state.status = 201
+
+    @app.post("/things/", status_code=201)
+    def create_thing():
+        app.state.calls += 1
+        if app.state.status != 201:
+            raise HTTPException(status_code=app.state.status, detail="try later", headers={"Retry-After": "1"})
+        return {"call": app.state.calls}
+
+    app.add_middleware(IdempotencyMiddleware, store=MemoryStore(ttl=60, lock_timeout=5),
+                       routes={("POST", "/things/")})
+    return app
+
+
+def test_success_is_replayed(app):
+    with TestClient(app) as client:
+        first = client.post("/things/", json={"a": 1}, headers={"Idempotency-Key": "k"})
+        second = client.post("/things/", json={"a": 1}, headers={"Idempotency-Key": "k"})
+    assert first.json() == second.json() == {"call": 1}
+    assert second.headers["idempotent-replayed"] == "true"
+
+
+@pytest.mark.parametrize("status", [408, 409, 429, 503])
+def test_retryable_responses_are_not_replayed(app, status):
+    with TestClient(app) as client:
+        app.state.status = status
+        rejected = client.post("/things/", json={"a": 1}, headers={"Idempotency-Key": "k"})
+        assert rejected.status_code == status
+        assert rejected.headers["retry-after"] == "1"
+
+        app.state.status = 201
+        retried = client.post("/things/", json={"a": 1}, headers={"Idempotency-Key": "k"})
+    assert retried.status_code == 201
+    assert "idempotent-replayed" not in retried.headers
+    assert app.state.calls == 2
+
+
+def test_oversized_body_is_rejected_without_a_claim():
+    app = FastAPI()
+
+    @app.post("/things/")
+    def create_thing():
+        return {}
+
+    store = MemoryStore(ttl=60, lock_timeout=5)
+    app.add_middleware(IdempotencyMiddleware, store=store, routes={("POST", "/things/")}, max_body_bytes=100)
+
+    def chunks():
+        yield b"x" * 80
+        yield b"x" * 80
+
+    with TestClient(app) as client:
+        declared = client.post("/things/", content=b"x" * 200, headers={"Idempotency-Key": "a"})
+        streamed = client.post("/things/", content=chunks(), headers={"Idempotency-Key": "b"})
+    assert declared.status_code == streamed.status_code == 413
+    assert len(store) == 0
+
+
+@pytest.fixture(params=["memory", "sql"])
+def make_store(request):
+    engines = []
+
+    def make(lock_timeout=5):
+        if request.param == "memory":
+            return MemoryStore(ttl=60, lock_timeout=lock_timeout)
+        path = os.path.join(tempfile.mkdtemp(), "idempotency.db")
+        engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False, "timeout": 5})
+        engines.append(engine)
+        return SQLStore(engine, ttl=60, lock_timeout=lock_timeout)
+
+    yield make
+    for engine in engines:
+        engine.dispose()
+
+
+def _gated_app():
+    """An app whose handler blocks until the test releases that call's gate"""
+    app = FastAPI()
+    app.state.calls = 0
+    app.state.gates = [asyncio.Event() for _ in range(3)]
+
+    @app.post("/things/", status_code=201)
+    async def create_thing():
+        app.state.calls += 1
+        call = app.state.calls
+        await app.state.gates[call - 1].wait()
+        return {"call": call}
+
+    return app
+
+
+def _client(middleware):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=middleware), base_url="http://test")
+
+
+async def _started(task, delay=0.1):
+    await asyncio.sleep(delay)
+    assert not task.done()
+    return task
+
+
+def test_sql_store_replays_across_instances():
+    path = os.path.join(tempfile.mkdtemp(), "idempotency.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False, "timeout": 5})
+    store = SQLStore(engine, ttl=60, lock_timeout=5)
+    app = FastAPI()
+
+    @app.post("/things/", status_code=201)
+    def create_thing():
+        return {"ok": True}
+
+    # A second store on the same table stands in for another worker process
+    other = SQLStore(store.engine, ttl=60, lock_timeout=5)
+    with TestClient(IdempotencyMiddleware(app, store, {("POST", "/things/")})) as first, \
+            TestClient(IdempotencyMiddleware(app, other, {("POST", "/things/")})) as second:
+        assert first.post("/things/", json={"a": 1}, headers={"Idempotency-Key": "k"}).status_code == 201
+        replayed = second.post("/things/", json={"a": 1}, headers={"Idempotency-Key": "k"})
+        mismatch = second.post("/things/", json={"a": 2}, headers={"Idempotency-Key": "k"})
+    engine.dispose()
+    assert replayed.headers["idempotent-replayed"] == "true"
+    assert mismatch.status_code == 422
+
+
+def test_concurrent_duplicate_waits_for_the_original(make_store):
+    app = _gated_app()
+    middleware = IdempotencyMiddleware(app, make_store(), {("POST", "/things/")}, wait_timeout=5)
+
+    async def scenario():
+        async with _client(middleware) as client:
+            post = lambda: client.post("/things/", json={"a": 1}, headers={"Idempotency-Key": "k"})
+            first = await _started(asyncio.create_task(post()))
+            duplicate = await _started(asyncio.create_task(post()))
+            app.state.gates[0].set()
+            return await first, await duplicate
+
+    first, duplicate = asyncio.run(scenario())
+    assert first.json() == duplicate.json() == {"call": 1}
+    assert duplicate.headers["idempotent-replayed"] == "true"
+    assert app.state.calls == 1
+
+
+def test_duplicate_gets_409_after_wait_timeout(make_store):
+    app = _gated_app()
+    middleware = IdempotencyMiddleware(app, make_store(), {("POST", "/things/")}, wait_timeout=0.2)
+
+    async def scenario():
+        async with _client(middleware) as client:
+            post = lambda: client.post("/things/", json={"a": 1}, headers={"Idempotency-Key": "k"})
+            first = await _started(asyncio.create_task(post()))
+            duplicate = await post()
+            app.state.gates[0].set()
+            return await first, duplicate
+
+    first, duplicate = asyncio.run(scenario())
+    assert first.status_code == 201
+    assert duplicate.status_code == 409
+    assert duplicate.headers["retry-after"] == "1"
+    assert app.state.calls == 1
+
+
+def test_reused_key_with_different_body_is_422(make_store):
+    app = _gated_app()
+    app.state.gates[0].set()
+    with TestClient(IdempotencyMiddleware(app, make_store(), {("POST", "/things/")})) as client:
+        assert client.post("/things/", json={"a": 1}, headers={"Idempotency-Key": "k"}).status_code == 201
+        mismatch = client.post("/things/", json={"a": 2}, headers={"Idempotency-Key": "k"})
+    assert mismatch.status_code == 422
+    assert app.state.calls == 1
+
+
+def test_expired_claim_taken_over_while_original_still_runs(make_store):
+    app = _gated_app()
+    middleware = IdempotencyMiddleware(app, make_store(lock_timeout=0.05), {("POST", "/things/")}, wait_timeout=5)
+
+    async def scenario():
+        async with _client(middleware) as client:
+            post = lambda: client.post("/things/", json={"a": 1}, headers={"Idempotency-Key": "k"})
+            original = await _started(asyncio.create_task(post()))
+            # The original's claim has expired, so this runs the handler again
+            takeover = await _started(asyncio.create_task(post()))
+            app.state.gates[0].set()
+            original = await original
+            app.state.gates[1].set()
+            return original, await takeover
+
+    original, takeover = asyncio.run(scenario())
+    assert (original.status_code, takeover.status_code) == (201, 201)
+    assert takeover.json() == {"call": 2}
+    assert middleware._finished == {}
@@ -0,0 +1,87 @@
+import threading
+import pytest
+from mail_transport import CircuitBreaker, CircuitOpenError
+
+
+@pytest.fixture
+def breaker():
+    return CircuitBreaker(failure_threshold=3, reset_timeout=30)
+
+
+def _open(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.before_call()
+        breaker.record_failure()
+
+
+def _wait_out_reset(breaker):
+    breaker.opened_at -= breaker.reset_timeout
+
+
+def test_opens_after_threshold_consecutive_failures(breaker):
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    breaker.before_call()
+    breaker.record_success()  # resets the streak
+    assert breaker.snapshot() == {"state": "closed", "consecutive_failures": 0}
+
+    _open(breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_fails_fast_while_open(breaker):
+    _open(breaker)
+    for _ in range(5):
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_half_open_lets_a_single_probe_through(breaker):
+    _open(breaker)
+    _wait_out_reset(breaker)
+
+    results = []
+    barrier = threading.Barrier(8)
+
+    def call():
+        barrier.wait()
+        try:
+            breaker.before_call()
+            results.append("probe")
+        except CircuitOpenError:
+            results.append("rejected")
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count("probe") == 1
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_successful_probe_closes(breaker):
+    _open(breaker)
+    _wait_out_reset(breaker)
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.snapshot() == {"state": "closed", "consecutive_failures": 0}
+    breaker.before_call()  # calls flow again
+
+
+def test_failed_probe_reopens(breaker):
+    _open(breaker)
+    _wait_out_reset(breaker)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    # A fresh reset timeout applies, then another single probe
+    _wait_out_reset(breaker)
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
@@ -0,0 +1,20 @@
+import review_stats
+
+
+def test_init_db_failure_returns_500(client, monkeypatch):
+    def broken():
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(review_stats, "ensure_stats", broken)
+    response = client.get("/init-db")
+    assert response.status_code == 500
+    assert "disk full" in response.json()["detail"]
+
+
+def test_pool_does_not_log_checkouts_at_debug(caplog):
+    import logging
+    from database import engine
+    with caplog.at_level(logging.DEBUG):
+        with engine.connect():
+            pass
+    assert not [record for record in caplog.records if record.name.startswith("database.")]
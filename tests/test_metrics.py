@@ -0,0 +1,77 @@
+import threading
+import pytest
+from metrics import Counter, Gauge, Histogram, Registry, http_requests_total
+
+
+def _on_threads(target, count=8):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_shards_from_many_threads_are_summed():
+    counter = Counter("jobs_total", "Jobs", ("kind",))
+    gauge = Gauge("busy", "Busy workers")
+    histogram = Histogram("job_seconds", "Job time", buckets=(0.1, 1.0))
+
+    def work():
+        for _ in range(1000):
+            counter.inc("a")
+        counter.inc("b", amount=2.5)
+        gauge.inc()
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+
+    _on_threads(work)
+    # Decrements from yet another thread still net out against the other shards
+    _on_threads(lambda: gauge.dec(amount=3), count=1)
+
+    assert len(counter._shards) == 8  # exited threads' shards are kept
+    assert counter.values() == {("a",): 8000.0, ("b",): 20.0}
+    assert gauge.values() == {(): 5.0}
+    assert histogram._merged()[()] == [8, 8, 8, pytest.approx(8 * 5.55)]
+
+
+def test_text_exposition():
+    reg = Registry()
+    counter = reg.register(Counter("jobs_total", "Jobs by kind", ("kind",)))
+    histogram = reg.register(Histogram("job_seconds", "Job time", ("queue",), buckets=(0.1, 1.0)))
+    counter.inc('say "hi"\n')
+    counter.inc("plain", amount=1.5)
+    histogram.observe(0.1, "q")
+    histogram.observe(2, "q")
+
+    assert reg.render() == "\n".join([
+        "# HELP jobs_total Jobs by kind",
+        "# TYPE jobs_total counter",
+        'jobs_total{kind="plain"} 1.5',
+        'jobs_total{kind="say \\"hi\\"\\n"} 1',
+        "# HELP job_seconds Job time",
+        "# TYPE job_seconds histogram",
+        'job_seconds_bucket{queue="q",le="0.1"} 1',
+        'job_seconds_bucket{queue="q",le="1"} 1',
+        'job_seconds_bucket{queue="q",le="+Inf"} 2',
+        'job_seconds_sum{queue="q"} 2.1',
+        'job_seconds_count{queue="q"} 2',
+    ]) + "\n"
+
+
+def test_metrics_endpoint_reports_requests_from_threadpool_handlers(client):
+    def requests_for(route):
+        return int(http_requests_total.values().get(("GET", route, "200"), 0))
+
+    before = requests_for("/health")
+    # /health is a plain def, so these run on several threadpool threads
+    _on_threads(lambda: client.get("/health"), count=6)
+    assert requests_for("/health") == before + 6
+
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = response.text.splitlines()
+    assert f'http_requests_total{{method="GET",route="/health",status="200"}} {before + 6}' in lines
+    assert "# TYPE http_request_duration_seconds histogram" in lines
+    assert any(line.startswith('http_request_duration_seconds_count{method="GET",route="/health"}') for line in lines)
+    assert "http_requests_in_flight 1" in lines  # the /metrics request itself
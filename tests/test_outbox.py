@@ -0,0 +1,187 @@
+import json
+import time
+import pytest
+from sqlalchemy import delete, select, update
+import outbox
+from database import SessionLocal
+from mail_transport import FakeTransport
+from models import EmailOutbox
+from outbox import OutboxWorker, backoff_delay, enqueue_email
+from routers.send_email import build_owner_digest
+
+CONTACT = {"name": "Ada Lovelace", "email": "ada@example.com", "message": "Could you quote for a walnut desk?"}
+
+
+@pytest.fixture(autouse=True)
+def empty_outbox():
+    with SessionLocal() as db:
+        db.execute(delete(EmailOutbox))
+        db.commit()
+
+
+def _queue(*payloads, kind="test"):
+    with SessionLocal() as db:
+        for payload in payloads:
+            enqueue_email(db, kind, payload)
+        db.commit()
+
+
+def _rows():
+    with SessionLocal() as db:
+        return db.scalars(select(EmailOutbox).order_by(EmailOutbox.id)).all()
+
+
+def _make_due():
+    # Skip the backoff wait instead of sleeping through it
+    with SessionLocal() as db:
+        db.execute(update(EmailOutbox).values(next_attempt_at=time.time() - 1))
+        db.commit()
+
+
+def test_backoff_doubles_with_jitter_and_cap(monkeypatch):
+    monkeypatch.setattr(outbox, "OUTBOX_BACKOFF_BASE", 5)
+    monkeypatch.setattr(outbox, "OUTBOX_BACKOFF_MAX", 60)
+    assert 5 <= backoff_delay(1) <= 5.5
+    assert 20 <= backoff_delay(3) <= 22
+    assert 60 <= backoff_delay(10) <= 66
+
+
+def test_failed_send_is_retried_after_backoff():
+    transport = FakeTransport(fail_times=1)
+    worker = OutboxWorker(transport)
+    _queue({"to": ["a@example.com"]})
+
+    before = time.time()
+    assert worker.run_once() == 1
+    [row] = _rows()
+    assert (row.status, row.attempts) == ("pending", 1)
+    assert row.last_error == "simulated send failure"
+    assert row.next_attempt_at >= before + outbox.OUTBOX_BACKOFF_BASE
+
+    # Not due yet
+    assert worker.run_once() == 0
+    assert transport.sent == []
+
+    _make_due()
+    assert worker.run_once() == 1
+    [row] = _rows()
+    assert (row.status, row.attempts, row.last_error) == ("sent", 2, None)
+    assert transport.sent == [{"to": ["a@example.com"]}]
+
+
+def test_dead_lettered_after_max_attempts():
+    worker = OutboxWorker(FakeTransport(fail_times=10), max_attempts=3)
+    _queue({"to": ["a@example.com"]})
+
+    for _ in range(3):
+        assert worker.run_once() == 1
+        _make_due()
+    [row] = _rows()
+    assert (row.status, row.attempts) == ("dead", 3)
+    assert worker.run_once() == 0
+    assert worker.counts() == {"dead": 1}
+
+
+def test_lease_lets_only_one_worker_claim_a_row():
+    _queue({"to": ["a@example.com"]}, {"to": ["b@example.com"]})
+    now = time.time()
+    columns = (EmailOutbox.id, EmailOutbox.payload, EmailOutbox.attempts, EmailOutbox.next_attempt_at)
+
+    # Both workers saw the same due rows; the second one's compare-and-set loses
+    with SessionLocal() as first, SessionLocal() as second:
+        due = first.execute(select(*columns)).all()
+        assert len(due) == 2
+        claimed = OutboxWorker._lease(second, second.execute(select(*columns)).all(), now)
+        second.commit()
+        assert len(claimed) == 2
+        assert OutboxWorker._lease(first, due, now) == []
+        first.commit()
+
+    # The lease also keeps the rows out of later polls until it expires
+    assert OutboxWorker(FakeTransport())._claim(time.time()) == []
+    assert [row.attempts for row in _rows()] == [1, 1]
+
+
+def test_contact_form_queues_both_emails_in_one_transaction(client, monkeypatch):
+    monkeypatch.setenv("SKIP_EMAIL", "false")
+    monkeypatch.setattr(outbox, "outbox_worker", None)
+
+    assert client.post("/contact/", json=CONTACT).status_code == 201
+    rows = _rows()
+    assert [row.kind for row in rows] == ["owner_notification", "customer_confirmation"]
+    assert json.loads(rows[1].payload)["to"] == [CONTACT["email"]]
+
+    # If the second email can't be queued, the first isn't committed either
+    def broken(form):
+        raise RuntimeError("template error")
+
+    monkeypatch.setattr("routers.contact.build_confirmation_email", broken)
+    assert client.post("/contact/", json=CONTACT).status_code == 500
+    assert len(_rows()) == 2
+
+    transport = FakeTransport()
+    assert OutboxWorker(transport).run_once() == 2
+    assert {payload["subject"] for payload in transport.sent} == {
+        json.loads(row.payload)["subject"] for row in rows
+    }
+
+
+def _queue_digest_items(count, age=0.0):
+    _queue(*({"name": f"Person {i}", "email": f"p{i}@example.com", "message": f"Message {i}"} for i in range(count)),
+           kind=outbox.KIND_DIGEST_ITEM)
+    if age:
+        with SessionLocal() as db:
+            db.execute(update(EmailOutbox).values(next_attempt_at=EmailOutbox.next_attempt_at - age))
+            db.commit()
+
+
+def test_digest_sent_once_batch_is_full():
+    transport = FakeTransport()
+    worker = OutboxWorker(transport, digest_builder=build_owner_digest, digest_interval=300, digest_max_batch=3)
+
+    _queue_digest_items(2)
+    assert worker.run_once() == 0
+    _queue_digest_items(1)
+    assert worker.run_once() == 3
+    [digest] = transport.sent
+    assert digest["subject"] == "3 new contact form messages"
+    assert {row.status for row in _rows()} == {"sent"}
+
+
+def test_digest_sent_once_oldest_item_is_old_enough():
+    transport = FakeTransport()
+    worker = OutboxWorker(transport, digest_builder=build_owner_digest, digest_interval=300, digest_max_batch=25)
+
+    _queue_digest_items(2, age=200)
+    assert worker.run_once() == 0
+
+    with SessionLocal() as db:
+        db.execute(update(EmailOutbox).values(next_attempt_at=time.time() - 301))
+        db.commit()
+    assert worker.run_once() == 2
+    assert transport.sent[0]["subject"] == "2 new contact form messages"
+
+
+def test_leftover_digest_items_drained_when_digest_mode_is_off(monkeypatch):
+    monkeypatch.setattr(outbox, "OWNER_DIGEST_ENABLED", False)
+    monkeypatch.setattr(outbox, "outbox_worker", None)
+    _queue_digest_items(2)
+
+    transport = FakeTransport()
+    worker = outbox.start_outbox_worker(transport)
+    try:
+        worker.wake()
+        deadline = time.time() + 5
+        while not transport.sent and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        worker.stop()
+    assert len(transport.sent) == 1
+    assert {row.status for row in _rows()} == {"sent"}
+
+
+def test_worker_without_builder_still_sends_digests():
+    transport = FakeTransport()
+    _queue_digest_items(1)
+    assert OutboxWorker(transport, digest_interval=0).run_once() == 1
+    assert "Person 0" in transport.sent[0]["text"]
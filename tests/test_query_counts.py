@@ -0,0 +1,44 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from database import engine
+from query_profiler import assert_max_queries
+from routers.review import review_cache
+
+
+@pytest.fixture(autouse=True)
+def cold_cache():
+    review_cache.invalidate()
+    yield
+    review_cache.invalidate()
+
+
+def test_review_page_is_one_query(client):
+    with assert_max_queries(1) as stats:
+        assert client.get("/reviews/", params={"limit": 20}).status_code == 200
+    assert stats.count == 1  # the profiler really saw the request
+
+
+def test_full_listing_is_one_query(client):
+    with assert_max_queries(1):
+        assert client.get("/reviews/").status_code == 200
+
+
+def test_cached_listing_runs_no_queries(client):
+    client.get("/reviews/", params={"limit": 20})
+    with assert_max_queries(0):
+        assert client.get("/reviews/", params={"limit": 20}).headers["x-cache"] == "HIT"
+
+
+def test_stats_is_one_query(client):
+    with assert_max_queries(1):
+        assert client.get("/reviews/stats").status_code == 200
+
+
+def test_failed_statement_does_not_leak_timer():
+    with engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM no_such_table"))
+            conn.rollback()
+        assert conn.info.get("query_start") == []
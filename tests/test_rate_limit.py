@@ -0,0 +1,101 @@
+import os
+import tempfile
+import threading
+import pytest
+from sqlalchemy import create_engine, select
+from models import RateLimitBucket
+from rate_limit import MemoryStore, RateLimiter, SQLStore
+
+
+def _hits(limiter, key, count, now):
+    return [limiter.hit(key, now) for _ in range(count)]
+
+
+def test_previous_window_is_weighted_by_overlap():
+    limiter = RateLimiter(10, 60)
+    results = _hits(limiter, "ip", 11, now=30)
+    assert [r.allowed for r in results] == [True] * 10 + [False]
+
+    # Halfway into the next window, half of the previous 10 still count
+    results = _hits(limiter, "ip", 6, now=90)
+    assert [r.allowed for r in results] == [True] * 5 + [False]
+    assert results[0].remaining == 4 and results[-1].remaining == 0
+
+    # Three quarters in: 10 * 0.25 + 5 + this hit = 8.5 of 10
+    assert limiter.hit("ip", 105).remaining == 1
+    # Two windows later nothing carries over
+    assert limiter.hit("ip", 185).remaining == 9
+
+
+def test_memory_store_evicts_least_recently_seen_at_max_keys():
+    store = MemoryStore(max_keys=3)
+    limiter = RateLimiter(5, 60, store)
+    for key in ("a", "b", "c"):
+        limiter.hit(key, 10)
+    limiter.hit("a", 11)  # "b" is now the least recently seen
+    limiter.hit("d", 12)
+    assert len(store) == 3
+    assert limiter.hit("b", 13).remaining == 4  # forgotten, so a fresh budget
+    assert limiter.hit("a", 13).remaining == 2
+
+
+def test_memory_store_drops_idle_keys():
+    store = MemoryStore(max_keys=100)
+    limiter = RateLimiter(5, 60, store)
+    limiter.hit("idle", 10)
+    limiter.hit("active", 200)
+    assert len(store) == 1
+
+
+@pytest.fixture
+def sql_store():
+    path = os.path.join(tempfile.mkdtemp(), "ratelimit.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False, "timeout": 5})
+    yield SQLStore(engine)
+    engine.dispose()
+
+
+def test_sql_store_shares_one_budget_across_threads(sql_store):
+    limiter = RateLimiter(20, 60, sql_store)
+    allowed = []
+
+    def worker():
+        for _ in range(5):
+            allowed.append(limiter.hit("shared", 30).allowed)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert allowed.count(True) == 20
+    assert len(allowed) == 40
+
+    # Same weighting as the memory store
+    assert limiter.hit("shared", 90).remaining == 9
+    assert limiter.hit("other", 90).remaining == 19
+
+
+def test_sql_store_purges_idle_keys(sql_store):
+    limiter = RateLimiter(5, 60, sql_store)
+    limiter.hit("idle", 10)
+    limiter.hit("active", 200)
+    sql_store.purge(200 - 120)
+    with sql_store.engine.connect() as conn:
+        keys = conn.scalars(select(RateLimitBucket.key)).all()
+    assert keys == ["active"]
+
+
+def test_headers():
+    limiter = RateLimiter(2, 60)
+    allowed = limiter.hit("ip", 15).headers()
+    assert allowed == {
+        "RateLimit-Limit": "2",
+        "RateLimit-Remaining": "1",
+        "RateLimit-Reset": "45",
+        "RateLimit-Policy": "2;w=60",
+    }
+    limiter.hit("ip", 15)
+    rejected = limiter.hit("ip", 59.5).headers()
+    assert rejected["RateLimit-Remaining"] == "0"
+    assert rejected["RateLimit-Reset"] == rejected["Retry-After"] == "1"
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import event
+import database
+from database import Base, ReplicaSet
+from routers.review import review_cache
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    # An empty replica stands in for one that hasn't caught up with the primary
+    path = os.path.join(tempfile.mkdtemp(), "replica.db")
+    replica_set = ReplicaSet([f"sqlite:///{path}"])
+    Base.metadata.create_all(bind=replica_set.engines[0])
+    checkouts = []
+    event.listen(replica_set.engines[0], "checkout", lambda *args: checkouts.append(1))
+    monkeypatch.setattr(database, "replicas", replica_set)
+    monkeypatch.setattr(database, "_last_write", float("-inf"))
+    review_cache.invalidate()
+    yield checkouts
+    review_cache.invalidate()
+    replica_set.engines[0].dispose()
+
+
+def test_cache_hit_does_not_touch_replica(client, replica):
+    first = client.get("/reviews/", params={"limit": 5})
+    assert first.headers["x-cache"] == "MISS"
+    assert len(replica) == 1
+
+    assert client.get("/reviews/", params={"limit": 5}).headers["x-cache"] == "HIT"
+    not_modified = client.get("/reviews/", params={"limit": 5}, headers={"If-None-Match": first.headers["etag"]})
+    assert not_modified.status_code == 304
+    assert len(replica) == 1
+
+
+def test_pin_cookie_works_cross_site(client, replica):
+    response = client.post("/reviews/", json={"name": "Pin Check", "text": "Checking the primary pin cookie", "rating": 5})
+    assert response.status_code == 200
+    cookie = response.headers["set-cookie"].lower()
+    assert "samesite=none" in cookie and "secure" in cookie
+    assert float(response.headers["x-db-primary-until"]) > 0
+
+
+def test_cache_refilled_from_primary_after_write(client, replica):
+    client.post("/reviews/", json={"name": "Fresh Write", "text": "Should not be hidden by lagging replica", "rating": 4})
+    client.cookies.clear()
+
+    # Another visitor, not pinned: must not cache the replica's stale page
+    listing = client.get("/reviews/", params={"limit": 5})
+    assert listing.headers["x-cache"] == "MISS"
+    assert "Fresh Write" in [item["name"] for item in listing.json()["items"]]
+    assert len(replica) == 0
+
+
+@pytest.mark.parametrize("value, pinned", [
+    (database.PRIMARY_PIN_SECONDS - 1, True),  # seconds from now
+    (-1, False),
+    (database.PRIMARY_PIN_SECONDS + 60, False),
+    ("9999999999", False),
+    ("inf", False),
+    ("nan", False),
+    ("soon", False),
+])
+def test_pin_value_is_bounded(value, pinned):
+    until = str(time.time() + value) if isinstance(value, int) else value
+    assert database._pinned(SimpleNamespace(headers={database.PRIMARY_PIN_HEADER: until}, cookies={})) is pinned
+    assert database._pinned(SimpleNamespace(headers={}, cookies={database.PRIMARY_PIN_COOKIE: until})) is pinned
+
+
+def test_forged_pin_header_does_not_bypass_cache(client, replica):
+    client.get("/reviews/", params={"limit": 5})
+    forged = client.get("/reviews/", params={"limit": 5}, headers={database.PRIMARY_PIN_HEADER: "9999999999"})
+    assert forged.headers["x-cache"] == "HIT"
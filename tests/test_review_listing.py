@@ -0,0 +1,82 @@
+import json
+import pytest
+from routers import review
+from routers.review import review_cache
+
+# Newer than anything else in the test database, so these lead the listing
+TIED_AT = "2099-01-01T12:00:00"
+
+
+@pytest.fixture
+def tied_reviews(client, monkeypatch):
+    monkeypatch.setattr(review, "ADMIN_TOKEN", None)
+    monkeypatch.setattr(review, "ADMIN_OPEN_WITHOUT_TOKEN", True)
+    lines = [json.dumps({"name": f"Tied Reviewer {i}", "text": "Same second as the others", "rating": 5,
+                         "created_at": TIED_AT}) for i in range(5)]
+    assert client.post("/reviews/import", content="\n".join(lines).encode()).json()["inserted"] == 5
+    ids = [item["id"] for item in client.get("/reviews/", params={"limit": 5}).json()["items"]]
+    yield ids
+    for review_id in ids:
+        client.delete(f"/reviews/{review_id}")
+
+
+def _walk(client, limit):
+    items, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/reviews/", params=params).json()
+        items += page["items"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items
+
+
+def test_cursor_pages_through_equal_timestamps(client, tied_reviews):
+    assert tied_reviews == sorted(tied_reviews, reverse=True)  # ties broken by id, newest first
+
+    for limit in (1, 2, 3):
+        walked = _walk(client, limit)
+        assert [item["id"] for item in walked] == [item["id"] for item in client.get("/reviews/").json()]
+        assert [item["id"] for item in walked[:5]] == tied_reviews
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "bm90IGpzb24", "WyJub3QgYSBkYXRlIiwgMV0", "WzFd"])
+def test_malformed_cursor_is_400(client, cursor):
+    response = client.get("/reviews/", params={"limit": 2, "cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+@pytest.fixture
+def cold_cache():
+    review_cache.invalidate()
+    yield
+    review_cache.invalidate()
+
+
+def test_etag_revalidation_and_invalidation_after_writes(client, cold_cache):
+    first = client.get("/reviews/", params={"limit": 5})
+    assert first.headers["x-cache"] == "MISS"
+    etag = first.headers["etag"]
+
+    cached = client.get("/reviews/", params={"limit": 5})
+    assert (cached.headers["x-cache"], cached.headers["etag"]) == ("HIT", etag)
+    assert cached.content == first.content
+
+    for header in (etag, f'"other", {etag}', "*"):
+        not_modified = client.get("/reviews/", params={"limit": 5}, headers={"If-None-Match": header})
+        assert not_modified.status_code == 304 and not_modified.content == b""
+        assert not_modified.headers["etag"] == etag
+    assert client.get("/reviews/", params={"limit": 5}, headers={"If-None-Match": '"other"'}).status_code == 200
+
+    created = client.post("/reviews/", json={"name": "Cache Buster", "text": "A new review changes the page", "rating": 5})
+    after_create = client.get("/reviews/", params={"limit": 5}, headers={"If-None-Match": etag})
+    assert after_create.status_code == 200
+    assert after_create.headers["x-cache"] == "MISS"
+    assert after_create.headers["etag"] != etag
+    assert created.json()["id"] in [item["id"] for item in after_create.json()["items"]]
+
+    client.delete(f"/reviews/{created.json()['id']}")
+    after_delete = client.get("/reviews/", params={"limit": 5}, headers={"If-None-Match": after_create.headers["etag"]})
+    assert after_delete.status_code == 200
+    assert after_delete.headers["etag"] == etag  # back to the original content
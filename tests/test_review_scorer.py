@@ -0,0 +1,37 @@
+import pytest
+from review_scorer import score_review
+
+GENUINE = [
+    ("Mary Johnson", "Greatest carpenter around, the built-ins in our den are perfect."),
+    ("Tom Baker", "The latest kitchen remodel came out better than we imagined."),
+    ("Linda Chen", "He showed us a sample of the oak before starting, and the stairs look fantastic."),
+    ("Bob Smith", "Amazing work, thanks!"),
+    ("Karen Miller", "Great work, amazing!"),
+    ("Ann Lee", "Excellent deck, finished on time and on budget. Wonderful to work with."),
+    ("Sam Fakhoury", "Contested a quote from another shop and Oldweiler beat it with better materials."),
+    ("Jo", "Great job on the porch railing, everyone on the street has asked who did it."),
+    ("Jane Doe", "We hired them after moisture testing showed rot; the new deck is beautiful."),
+]
+
+SPAM = [
+    ("Test User", "This is a test review"),
+    ("demo", "testing testing"),
+    ("Jane", "testing 123"),
+    ("John", "Sample review for the demo site"),
+]
+
+
+@pytest.mark.parametrize("name,text", GENUINE)
+def test_genuine_reviews_are_not_flagged(name, text):
+    score = score_review(name, text)
+    assert not score.flagged, score
+
+
+@pytest.mark.parametrize("name,text", SPAM)
+def test_test_reviews_are_flagged(name, text):
+    assert score_review(name, text).flagged
+
+
+def test_test_words_match_whole_words_only():
+    assert "test_word" not in score_review("Latest Greatest", "Very happy with the new cabinets overall.").reasons
+    assert "test_word" in score_review("Test Account", "Very happy with the new cabinets overall.").reasons
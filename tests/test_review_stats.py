@@ -0,0 +1,77 @@
+from sqlalchemy import delete, event, false, func, select
+from sqlalchemy.sql.dml import Insert
+from database import SessionLocal, engine
+from models import Review, ReviewStats
+from review_stats import get_stats, rebuild_stats
+
+
+def _published_count(db):
+    return db.scalar(select(func.count()).select_from(Review).where(Review.flagged == false()))
+
+
+def test_concurrent_rebuilds_of_missing_row_both_succeed():
+    with SessionLocal() as db:
+        db.execute(delete(ReviewStats))
+        db.commit()
+
+    raced = []
+
+    def competitor_inserts_first(conn, clauseelement, *args):
+        # Just before this rebuild writes the row, another one creates it
+        if raced or not isinstance(clauseelement, Insert) or clauseelement.table.name != "review_stats":
+            return
+        raced.append(True)
+        with SessionLocal() as other:
+            rebuild_stats(other)
+            other.commit()
+
+    event.listen(engine, "before_execute", competitor_inserts_first)
+    try:
+        with SessionLocal() as db:
+            review_count = rebuild_stats(db).review_count
+            db.commit()
+    finally:
+        event.remove(engine, "before_execute", competitor_inserts_first)
+
+    assert raced
+    with SessionLocal() as db:
+        assert review_count == _published_count(db)
+        assert get_stats(db)["review_count"] == _published_count(db)
+
+
+def _expected_stats():
+    # What a full rebuild computes, without writing it
+    with SessionLocal() as db:
+        expected = get_stats(db)
+        rebuild_stats(db)
+        rebuilt = get_stats(db)
+        db.rollback()
+    return expected, rebuilt
+
+
+def test_incremental_bookkeeping_matches_a_rebuild(client, monkeypatch):
+    from routers import review
+    monkeypatch.setattr(review, "ADMIN_TOKEN", None)
+    monkeypatch.setattr(review, "ADMIN_OPEN_WITHOUT_TOKEN", True)
+    before = client.get("/reviews/stats").json()
+
+    rated = client.post("/reviews/", json={"name": "Ada Lovelace", "text": "Solid oak shelves, fitted in a day.", "rating": 4}).json()
+    unrated = client.post("/reviews/", json={"name": "Grace Hopper", "text": "Quick quote and a tidy workshop visit."}).json()
+    flagged = client.post("/reviews/", json={"name": "test", "text": "this is a test review", "rating": 1}).json()
+
+    after = client.get("/reviews/stats").json()
+    assert after["review_count"] == before["review_count"] + 2
+    assert after["rated_count"] == before["rated_count"] + 1
+    assert after["unrated_count"] == before["unrated_count"] + 1
+    assert after["histogram"]["4"] == before["histogram"]["4"] + 1
+    assert after["histogram"]["1"] == before["histogram"]["1"]  # flagged reviews aren't counted
+
+    assert client.post(f"/reviews/{flagged['id']}/approve").status_code == 200
+    assert client.get("/reviews/stats").json()["histogram"]["1"] == before["histogram"]["1"] + 1
+
+    for created in (rated, unrated, flagged):
+        assert client.delete(f"/reviews/{created['id']}").status_code == 200
+    assert client.get("/reviews/stats").json() == before
+
+    kept, rebuilt = _expected_stats()
+    assert kept == rebuilt
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import Session
+import main
+from database import Base, SessionLocal, get_read_db
+from models import Review
+from search import fts5_query
+
+
+@pytest.fixture
+def reviews(client):
+    created = []
+
+    def add(name, text):
+        response = client.post("/reviews/", json={"name": name, "text": text, "rating": 5})
+        assert response.status_code == 200
+        created.append(response.json()["id"])
+        return created[-1]
+
+    yield add
+    for review_id in created:
+        client.delete(f"/reviews/{review_id}")
+
+
+def _ids(client, q, **params):
+    return [item["id"] for item in client.get("/reviews/search", params={"q": q, **params}).json()["items"]]
+
+
+def test_fts5_query_quotes_every_word():
+    assert fts5_query('kitchen "deck" OR-NEAR*') == '"kitchen" "deck" "OR" "NEAR"'
+    assert fts5_query("  ?! ") == ""
+
+
+def test_index_follows_inserts_updates_and_deletes(client, reviews):
+    review_id = reviews("Zara Quill", "Lovely zebrawood inlay on the jewellery box lid.")
+    assert _ids(client, "zebrawood") == [review_id]
+    assert _ids(client, "zara") == [review_id]
+
+    with SessionLocal() as db:
+        db.execute(update(Review).where(Review.id == review_id).values(text="Lovely bubinga inlay on the lid."))
+        db.commit()
+    assert _ids(client, "zebrawood") == []
+    assert _ids(client, "bubinga") == [review_id]
+
+    client.delete(f"/reviews/{review_id}")
+    assert _ids(client, "bubinga") == []
+
+
+def test_results_ranked_by_relevance(client, reviews):
+    once = reviews("Pat Ames", "The purpleheart bench is sturdy and the finish is smooth and even.")
+    often = reviews("Lee Ames", "Purpleheart shelves, purpleheart trim and a purpleheart door.")
+    assert _ids(client, "purpleheart") == [often, once]
+
+
+def test_next_offset_boundary(client, reviews):
+    ids = {reviews(f"Wen Lo {i}", f"Spalted maple cutting board number {i}, beautifully made.") for i in range(3)}
+
+    first = client.get("/reviews/search", params={"q": "spalted", "limit": 2}).json()
+    assert first["next_offset"] == 2
+    last = client.get("/reviews/search", params={"q": "spalted", "limit": 2, "offset": 2}).json()
+    assert last["next_offset"] is None
+    assert {item["id"] for item in first["items"] + last["items"]} == ids
+
+    assert client.get("/reviews/search", params={"q": "spalted", "limit": 3}).json()["next_offset"] is None
+
+
+def test_missing_index_is_503(client):
+    path = os.path.join(tempfile.mkdtemp(), "no-fts.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)  # tables, but install_search_index never ran
+
+    def without_index():
+        with Session(engine) as db:
+            yield db
+
+    main.app.dependency_overrides[get_read_db] = without_index
+    try:
+        response = client.get("/reviews/search", params={"q": "oak"})
+    finally:
+        del main.app.dependency_overrides[get_read_db]
+        engine.dispose()
+    assert response.status_code == 503
+    assert "run init_db" in response.json()["detail"]
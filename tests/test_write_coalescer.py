@@ -0,0 +1,97 @@
+import threading
+import time
+import pytest
+from sqlalchemy import select
+from database import SessionLocal
+from models import Review
+from write_coalescer import ReviewWriteCoalescer
+
+
+def _values(name, **overrides):
+    return {"name": name, "text": "Coalescer test review text", "rating": 5, "spam_score": 0.0, "flagged": False,
+            **overrides}
+
+
+def _names(prefix):
+    with SessionLocal() as db:
+        return sorted(db.scalars(select(Review.name).where(Review.name.like(f"{prefix}%"))))
+
+
+@pytest.fixture
+def coalescer():
+    # A long window keeps submissions pending long enough to cancel them
+    coalescer = ReviewWriteCoalescer(max_wait_ms=200)
+    yield coalescer
+    coalescer.stop()
+
+
+def test_cancelled_submit_is_withdrawn_and_writer_survives(coalescer):
+    cancelled = coalescer.enqueue(_values("cancel-a"))
+    kept = coalescer.enqueue(_values("cancel-b"))
+    assert cancelled.cancel()
+
+    assert kept.result(5)["name"] == "cancel-b"
+    assert _names("cancel-") == ["cancel-b"]
+    assert coalescer._thread.is_alive()
+    assert coalescer.submit(_values("cancel-c"), timeout=5)["id"]
+
+
+def test_cancelled_submit_in_failing_batch_is_not_written(coalescer):
+    cancelled = coalescer.enqueue(_values("retry-a"))
+    bad = coalescer.enqueue({**_values("retry-bad"), "name": None})
+    kept = coalescer.enqueue(_values("retry-b"))
+    assert cancelled.cancel()
+
+    assert kept.result(5)["name"] == "retry-b"
+    with pytest.raises(Exception):
+        bad.result(5)
+    assert _names("retry-") == ["retry-b"]
+    assert coalescer.submit(_values("retry-c"), timeout=5)["id"]
+
+
+def test_submit_timeout_withdraws_the_queued_row(coalescer):
+    coalescer.max_wait = 1
+    coalescer.enqueue(_values("timeout-a"))  # opens a batch that waits its full window
+    with pytest.raises(TimeoutError):
+        coalescer.submit(_values("timeout-b"), timeout=0.1)
+    coalescer.stop()
+    assert _names("timeout-") == ["timeout-a"]
+
+
+def test_submit_timeout_after_writer_took_the_row_waits_for_it(coalescer, monkeypatch):
+    taken = threading.Event()
+    write = coalescer._write
+
+    def slow_write(batch):
+        taken.set()
+        time.sleep(0.3)
+        return write(batch)
+
+    monkeypatch.setattr(coalescer, "_write", slow_write)
+    coalescer.max_wait = 0
+    assert coalescer.submit(_values("slow-a"), timeout=0.1)["name"] == "slow-a"
+    assert taken.is_set()
+    assert _names("slow-") == ["slow-a"]
+
+
+def test_coalesced_create_timeout_is_a_retryable_503(client, monkeypatch, coalescer):
+    from routers import review
+    monkeypatch.setattr(review, "review_coalescer", coalescer)
+
+    def timed_out(values, timeout=30):
+        raise TimeoutError
+
+    monkeypatch.setattr(coalescer, "submit", timed_out)
+    response = client.post("/reviews/", json={"name": "Slow Writer", "text": "Queued behind a slow write", "rating": 4})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+
+def test_dead_writer_thread_is_restarted(coalescer):
+    # Stands in for a writer thread that died
+    dead = threading.Thread(target=lambda: None)
+    dead.start()
+    dead.join()
+    coalescer._thread = dead
+
+    assert coalescer.submit(_values("restart-b"), timeout=5)["name"] == "restart-b"
@@ -0,0 +1,172 @@
+"""
+Group commit for review inserts.
+
+Request threads hand their already-scored row to ReviewWriteCoalescer and
+block on a Future. A single writer thread collects whatever arrives within
+max_wait_ms (up to max_batch rows) and writes the batch in one transaction:
+a multi-row INSERT ... RETURNING plus one review_stats update, so a burst
+pays for one write lock and one fsync instead of one per request.
+
+If the batch fails, its rows are retried one transaction each, so a bad row
+only fails its own request. A caller that gives up (submit() timing out, a
+cancelled async request) withdraws its row if the writer hasn't taken it
+yet, so a client retry can't create a duplicate. Once taken, the row is
+written and its result is simply dropped.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from typing import Optional
+from sqlalchemy import insert
+from database import SessionLocal
+from models import Review
+from review_stats import record_reviews_added
+
+logger = logging.getLogger(__name__)
+
+REVIEW_WRITE_COALESCING = os.getenv("REVIEW_WRITE_COALESCING", "false").lower() == "true"
+REVIEW_COALESCE_MAX_BATCH = int(os.getenv("REVIEW_COALESCE_MAX_BATCH", "64"))
+REVIEW_COALESCE_MAX_WAIT_MS = float(os.getenv("REVIEW_COALESCE_MAX_WAIT_MS", "5"))
+
+_RETURNING = (Review.id, Review.created_at)
+_STOP = object()
+
+
+class ReviewWriteCoalescer:
+    def __init__(self, session_factory=SessionLocal, max_batch: int = REVIEW_COALESCE_MAX_BATCH,
+                 max_wait_ms: float = REVIEW_COALESCE_MAX_WAIT_MS):
+        self.session_factory = session_factory
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="review-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        """Write whatever is queued, then stop the writer thread"""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def enqueue(self, values: dict) -> Future:
+        """Queue one row of Review column values; the Future resolves to them plus id and created_at"""
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+        future = Future()
+        self._queue.put((values, future))
+        return future
+
+    def submit(self, values: dict, timeout: Optional[float] = 30) -> dict:
+        """enqueue() and wait; raises TimeoutError only if the row was withdrawn unwritten"""
+        future = self.enqueue(values)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            if future.cancel():
+                raise
+            # The writer already has it: wait for that write rather than report a failure
+            return future.result()
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = [first]
+            stopping = False
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            # Drop rows whose caller gave up while they were queued; the rest
+            # can no longer be cancelled
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                if stopping:
+                    return
+                continue
+            try:
+                results = self._write(batch)
+            except Exception as e:
+                # Nothing was committed, so each row can safely be tried on its own
+                logger.warning(f"Coalesced insert of {len(batch)} reviews failed, retrying one by one: {e}")
+                results = []
+                for item in batch:
+                    try:
+                        results.extend(self._write([item]))
+                    except Exception as item_error:
+                        results.append((item[1], item_error))
+            for future, outcome in results:
+                _resolve(future, outcome)
+            if stopping:
+                return
+
+    def _write(self, batch: list[tuple[dict, Future]]) -> list[tuple[Future, object]]:
+        """Insert the batch in one transaction; returns (future, row) pairs once committed"""
+        rows = [values for values, _ in batch]
+        db = self.session_factory()
+        try:
+            # sort_by_parameter_order keeps RETURNING rows aligned with the input
+            # rows even when SQLAlchemy splits them across several statements
+            stmt = insert(Review.__table__).returning(*_RETURNING, sort_by_parameter_order=True)
+            returned = db.execute(stmt, rows).all()
+            record_reviews_added(db, [values["rating"] for values in rows if not values["flagged"]])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        self.batches += 1
+        self.rows += len(batch)
+        return [
+            (future, {**values, "id": review_id, "created_at": created_at})
+            for (values, future), (review_id, created_at) in zip(batch, returned)
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "avg_batch": round(self.rows / self.batches, 2) if self.batches else None,
+            "queued": self._queue.qsize(),
+        }
+
+
+def _resolve(future: Future, outcome):
+    # The caller may have cancelled while the row was being written, possibly
+    # between the done() check and the set; either way there is no one to tell
+    if future.done():
+        return
+    try:
+        if isinstance(outcome, Exception):
+            future.set_exception(outcome)
+        else:
+            future.set_result(outcome)
+    except InvalidStateError:
+        pass
+
+
+review_coalescer = ReviewWriteCoalescer() if REVIEW_WRITE_COALESCING else None